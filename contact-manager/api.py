@@ -0,0 +1,338 @@
+import logging
+from sqlalchemy.exc import IntegrityError
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from models import db, Contact, ContactTombstone, DuplicateCandidate
+from forms import ContactForm
+from pagination import paginate_keyset
+from cache import stats_cache
+from http_cache import conditional, contacts_watermark, contact_watermark
+from typeahead import typeahead
+from changes import CursorExpired, changes_since
+from serializers import contact_columns, rows_to_dicts, iter_contacts_json
+
+logger = logging.getLogger(__name__)
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+# Fields a client may set; everything else in a payload is ignored
+CONTACT_FIELDS = ['full_name', 'phone_number', 'email', 'address', 'company', 'notes']
+
+def _error(message, status, **extra):
+    """JSON error response"""
+    return jsonify(error=message, **extra), status
+
+def _form_data(item):
+    """Coerce a JSON object into the string mapping ContactForm expects"""
+    return {
+        field: '' if item.get(field) is None else str(item[field])
+        for field in CONTACT_FIELDS
+    }
+
+def _batch_payload(key):
+    """Return the list of items in a batch request, or raise ValueError
+
+    Accepts a bare list, a single object, or an object wrapping the list
+    under `key` (e.g. {"contacts": [...]}).
+    """
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict) and key in payload:
+        payload = payload[key]
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list) or not payload:
+        raise ValueError(f'Expected a JSON object or a non-empty list of {key}.')
+    limit = current_app.config['API_MAX_BATCH_SIZE']
+    if len(payload) > limit:
+        raise ValueError(f'At most {limit} {key} per request.')
+    return payload
+
+@api.errorhandler(404)
+def not_found(error):
+    return _error('Not found.', 404)
+
+@api.get('/contacts')
+@conditional(contacts_watermark)
+def list_contacts():
+    """List or search contacts, paginated by cursor"""
+    search_query = request.args.get('search', '').strip()
+    limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+    query = Contact.search(search_query) if search_query else Contact.query
+    # Plain column rows instead of ORM objects; serialized in one pass below
+    query = query.with_entities(*contact_columns())
+    try:
+        page = paginate_keyset(
+            query,
+            Contact.full_name,
+            Contact.id,
+            per_page=limit,
+            after=request.args.get('after'),
+            before=request.args.get('before')
+        )
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    return jsonify(
+        contacts=rows_to_dicts(page.items),
+        next_cursor=page.next_cursor,
+        prev_cursor=page.prev_cursor
+    )
+
+@api.get('/contacts/export')
+@conditional(contacts_watermark)
+def export_contacts_json():
+    """Stream every contact as one JSON array"""
+    chunks = iter_contacts_json(batch_size=current_app.config['EXPORT_BATCH_SIZE'])
+    return Response(stream_with_context(chunks), mimetype='application/json')
+
+@api.get('/contacts/typeahead')
+def typeahead_contacts():
+    """Top matches for what has been typed so far: ?q=<name or email prefix>&limit="""
+    results = typeahead.suggest(request.args.get('q', ''), request.args.get('limit', type=int))
+    return jsonify(results=results)
+
+@api.get('/changes')
+def list_changes():
+    """Contacts changed and deleted since a cursor, oldest first: ?since=<cursor or ISO time>&limit="""
+    limit = request.args.get('limit', current_app.config['API_MAX_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+    try:
+        page = changes_since(
+            request.args.get('since', '').strip(),
+            limit,
+            settle_seconds=current_app.config['CHANGES_SETTLE_SECONDS'],
+            retention_days=current_app.config['CHANGES_RETENTION_DAYS']
+        )
+    except CursorExpired as e:
+        return _error(str(e), 410)
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    return jsonify(changes=page.changes, next_cursor=page.cursor, has_more=page.has_more)
+
+@api.get('/contacts/<int:contact_id>')
+@conditional(contact_watermark, last_modified=True)
+def get_contact(contact_id):
+    """Get one contact"""
+    contact = db.get_or_404(Contact, contact_id)
+    return jsonify(contact.to_dict())
+
+@api.post('/contacts')
+def create_contacts():
+    """Create one or many contacts in a single transaction"""
+    try:
+        items = _batch_payload('contacts')
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    contacts = []
+    errors = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'errors': {'contact': 'Expected a JSON object.'}})
+            continue
+        form = ContactForm(_form_data(item))
+        if not form.validate():
+            errors.append({'index': index, 'errors': form.errors})
+            continue
+        contacts.append(Contact(**form.get_cleaned_data()))
+
+    if errors:
+        return _error('Validation failed; no contacts were created.', 422, details=errors)
+
+    try:
+        db.session.add_all(contacts)
+        db.session.commit()
+        stats_cache.contacts_added(len(contacts))
+    except IntegrityError:
+        db.session.rollback()
+        return _error('A contact with one of these emails already exists; no contacts were created.', 409)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f'API error creating contacts: {str(e)}')
+        return _error('An error occurred while creating contacts.', 500)
+
+    logger.info(f'API created {len(contacts)} contacts')
+    return jsonify(contacts=[contact.to_dict() for contact in contacts]), 201
+
+def _apply_updates(items):
+    """Validate and apply partial updates; returns (contacts, errors, status)"""
+    ids = [item.get('id') for item in items if isinstance(item, dict)]
+    existing = {
+        contact.id: contact
+        for contact in Contact.query.filter(Contact.id.in_([i for i in ids if isinstance(i, int)]))
+    }
+
+    contacts = []
+    errors = []
+    status = 422
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('id'), int):
+            errors.append({'index': index, 'errors': {'id': 'An integer id is required.'}})
+            continue
+        contact = existing.get(item['id'])
+        if contact is None:
+            errors.append({'index': index, 'errors': {'id': f'Contact {item["id"]} not found.'}})
+            status = 404
+            continue
+
+        # Unspecified fields keep their current values
+        merged = {field: getattr(contact, field) for field in CONTACT_FIELDS}
+        merged.update({field: item[field] for field in CONTACT_FIELDS if field in item})
+        form = ContactForm(_form_data(merged))
+        if not form.validate():
+            errors.append({'index': index, 'errors': form.errors})
+            continue
+        contacts.append((contact, form.get_cleaned_data()))
+
+    if errors:
+        return None, errors, status
+
+    for contact, cleaned_data in contacts:
+        contact.update_from(cleaned_data)
+    return [contact for contact, _ in contacts], None, 200
+
+@api.patch('/contacts')
+def update_contacts():
+    """Partially update many contacts (each item carries its id) in a single transaction"""
+    try:
+        items = _batch_payload('contacts')
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    contacts, errors, status = _apply_updates(items)
+    if errors:
+        db.session.rollback()
+        return _error('Update failed; no contacts were changed.', status, details=errors)
+
+    try:
+        db.session.commit()
+        stats_cache.contacts_updated()
+    except IntegrityError:
+        db.session.rollback()
+        return _error('Another contact already uses this email; no contacts were changed.', 409)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f'API error updating contacts: {str(e)}')
+        return _error('An error occurred while updating contacts.', 500)
+
+    logger.info(f'API updated {len(contacts)} contacts')
+    return jsonify(contacts=[contact.to_dict() for contact in contacts])
+
+@api.route('/contacts/<int:contact_id>', methods=['PUT', 'PATCH'])
+def update_contact(contact_id):
+    """Update one contact"""
+    item = request.get_json(silent=True)
+    if not isinstance(item, dict):
+        return _error('Expected a JSON object.', 400)
+
+    contacts, errors, status = _apply_updates([dict(item, id=contact_id)])
+    if errors:
+        db.session.rollback()
+        return _error('Update failed.', status, details=errors)
+
+    try:
+        db.session.commit()
+        stats_cache.contacts_updated()
+    except IntegrityError:
+        db.session.rollback()
+        return _error('Another contact already uses this email; no contacts were changed.', 409)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f'API error updating contact {contact_id}: {str(e)}')
+        return _error('An error occurred while updating the contact.', 500)
+
+    logger.info(f'API updated contact {contact_id}')
+    return jsonify(contacts[0].to_dict())
+
+def _delete_ids(ids):
+    """Delete contacts by id in one statement; returns the ids that existed"""
+    found = [row[0] for row in db.session.execute(db.select(Contact.id).where(Contact.id.in_(ids)))]
+    if found:
+        # Bulk deletes skip the ORM flush, so clean up after them here
+        DuplicateCandidate.forget(db.session, found)
+        ContactTombstone.record(db.session, found)
+        db.session.execute(db.delete(Contact).where(Contact.id.in_(found)))
+    db.session.commit()
+    stats_cache.contacts_deleted(len(found))
+    return found
+
+@api.delete('/contacts')
+def delete_contacts():
+    """Delete many contacts: {"ids": [1, 2, 3]}"""
+    payload = request.get_json(silent=True)
+    ids = payload.get('ids') if isinstance(payload, dict) else payload
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+        return _error('Expected {"ids": [...]} with a non-empty list of integer ids.', 400)
+    if len(ids) > current_app.config['API_MAX_BATCH_SIZE']:
+        return _error(f'At most {current_app.config["API_MAX_BATCH_SIZE"]} ids per request.', 400)
+
+    try:
+        deleted = _delete_ids(ids)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f'API error deleting contacts: {str(e)}')
+        return _error('An error occurred while deleting contacts.', 500)
+
+    logger.info(f'API deleted {len(deleted)} contacts')
+    return jsonify(deleted=deleted, missing=sorted(set(ids) - set(deleted)))
+
+@api.delete('/contacts/<int:contact_id>')
+def delete_contact(contact_id):
+    """Delete one contact"""
+    try:
+        deleted = _delete_ids([contact_id])
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f'API error deleting contact {contact_id}: {str(e)}')
+        return _error('An error occurred while deleting the contact.', 500)
+
+    if not deleted:
+        return _error('Not found.', 404)
+    logger.info(f'API deleted contact {contact_id}')
+    return '', 204
+
+@api.get('/duplicates')
+def list_duplicates():
+    """Pending duplicate pairs, best matches first"""
+    limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+    page = DuplicateCandidate.query.filter_by(status=DuplicateCandidate.PENDING).order_by(
+        DuplicateCandidate.score.desc(), DuplicateCandidate.id
+    ).paginate(page=request.args.get('page', 1, type=int), per_page=limit, error_out=False)
+    return jsonify(
+        duplicates=[candidate.to_dict() for candidate in page.items],
+        total=page.total,
+        next_page=page.next_num
+    )
+
+@api.post('/duplicates/<int:candidate_id>/<action>')
+def resolve_duplicate(candidate_id, action):
+    """Merge a pair ({"keep": <contact id>}, default the older one) or dismiss it"""
+    from dedup import resolve_candidate
+    if action not in ('merge', 'dismiss'):
+        return _error('Not found.', 404)
+    candidate = db.get_or_404(DuplicateCandidate, candidate_id)
+    payload = request.get_json(silent=True) or {}
+    keep_id = payload.get('keep') if isinstance(payload, dict) else None
+    if keep_id is not None and not isinstance(keep_id, int):
+        return _error('"keep" must be a contact id.', 400)
+
+    try:
+        keep = resolve_candidate(candidate, keep_id, merge=action == 'merge')
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return _error(str(e), 400)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f'API error resolving duplicate pair {candidate_id}: {str(e)}')
+        return _error('An error occurred while resolving the pair.', 500)
+
+    if keep is None:
+        logger.info(f'API dismissed duplicate pair {candidate_id}')
+        return jsonify(status=DuplicateCandidate.DISMISSED)
+    stats_cache.contacts_deleted()
+    logger.info(f'API merged duplicate pair {candidate_id} into contact {keep.id}')
+    return jsonify(keep.to_dict())
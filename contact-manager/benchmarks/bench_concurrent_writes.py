@@ -0,0 +1,80 @@
+"""Concurrent-write benchmark: SQLite driver defaults vs the performance profile
+
+Each worker process runs its own app and commits one contact per
+transaction, like concurrent gunicorn workers handling add-contact requests.
+
+Usage: python benchmarks/bench_concurrent_writes.py [--workers 8] [--writes 200]
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+from fixtures import temp_database_url, generate_contacts
+
+def writer(profile, database_url, worker_id, writes, results, start=None):
+    os.environ['DB_PROFILE'] = profile
+    os.environ['DATABASE_URL'] = database_url
+    from app import app
+    from database import init_db
+    from models import db, Contact
+    from sqlalchemy.exc import OperationalError
+
+    locked = 0
+    with app.app_context():
+        if start is None:
+            init_db(app)
+        else:
+            # Don't time interpreter and app start-up
+            start.wait()
+        for row in generate_contacts(writes, seed=worker_id):
+            row['email'] = f'{worker_id}.{row["email"]}'
+            try:
+                db.session.add(Contact(**row))
+                db.session.commit()
+            except OperationalError:
+                db.session.rollback()
+                locked += 1
+    results.put(locked)
+
+def run(profile, workers, writes):
+    database_url = temp_database_url(f'writes-{profile}')
+    results = multiprocessing.Queue()
+
+    # Create the schema once so workers only contend on inserts
+    setup = multiprocessing.Process(target=writer, args=(profile, database_url, 0, 0, results))
+    setup.start()
+    setup.join()
+    results.get()
+
+    start = multiprocessing.Barrier(workers + 1)
+    processes = [
+        multiprocessing.Process(target=writer, args=(profile, database_url, i + 1, writes, results, start))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    start.wait()
+    started = time.perf_counter()
+    locked = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+    committed = workers * writes - locked
+    return committed / elapsed, locked
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=200)
+    args = parser.parse_args()
+    multiprocessing.set_start_method('spawn')
+
+    print(f'{args.workers} workers x {args.writes} single-row commits')
+    print(f"{'profile':<12} {'commits/s':>10} {'locked errors':>14}")
+    for profile in ('default', 'performance'):
+        rate, locked = run(profile, args.workers, args.writes)
+        print(f'{profile:<12} {rate:>10,.0f} {locked:>14}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Duplicate scan time and recall on synthetic contacts with injected near-duplicates
+
+Each injected duplicate copies a seeded contact and perturbs it the way
+real duplicates differ: reordered or misspelled names, reformatted phone
+numbers, +tags or another domain on the email. Recall is the share of
+injected pairs the scan reports; "other pairs" are reported pairs that were
+not injected (mostly same-name contacts that also share a company). The
+scan holds every contact's keys in memory; their peak size is measured
+separately, since tracemalloc would slow the timed scan.
+
+Usage: python benchmarks/bench_dedup.py [--sizes 10000 100000] [--duplicates 0.02] [--json results/dedup.json]
+"""
+import argparse
+import os
+import random
+import time
+import tracemalloc
+
+from fixtures import temp_database_url, seed_contacts, DOMAINS
+
+os.environ['DATABASE_URL'] = temp_database_url('dedup')
+
+from app import app
+from database import reset_db
+from models import db, Contact, DuplicateCandidate, normalize_email, normalize_name, normalize_phone
+from dedup import load_contact_keys, scan_duplicates
+from results import summarize, save_results
+
+def misspell(name, rng):
+    """Drop, double or swap one letter"""
+    i = rng.randrange(1, len(name) - 1)
+    choice = rng.randrange(3)
+    if choice == 0:
+        return name[:i] + name[i + 1:]
+    if choice == 1:
+        return name[:i] + name[i] + name[i:]
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+def perturb(contact, rng):
+    """A plausible duplicate entry of `contact`; keeps at least two of name, phone and email close"""
+    first, last = contact.full_name.split(' ', 1)
+    name = rng.choice([f'{last}, {first}', misspell(contact.full_name, rng), contact.full_name.upper()])
+    digits = ''.join(ch for ch in contact.phone_number if ch.isdigit())[-10:]
+    phone = rng.choice([f'{digits[:3]}.{digits[3:6]}.{digits[6:]}', f'({digits[:3]}) {digits[3:6]}-{digits[6:]}'])
+    local, domain = contact.email.split('@')
+    email = rng.choice([
+        f'{local}+{rng.choice(["work", "home", "news"])}@{domain}',
+        f'{local.replace(".", "")}@{domain}',
+        f'{local}@{rng.choice([d for d in DOMAINS if d != domain])}'
+    ])
+    # Drop one signal at random, as a hand-entered duplicate might
+    dropped = rng.randrange(4)
+    if dropped == 1:
+        phone = f'+1 ({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}'
+    elif dropped == 2:
+        email = f'{first}{rng.randint(1, 999)}@{rng.choice(DOMAINS)}'.lower()
+    return {
+        'full_name': name,
+        'phone_number': phone,
+        'email': email,
+        'email_normalized': normalize_email(email),
+        'name_normalized': normalize_name(name),
+        'phone_normalized': normalize_phone(phone),
+        'company': contact.company
+    }
+
+def inject_duplicates(count, seed=7):
+    """Insert `count` near-duplicates of random contacts; returns their (original, duplicate) id pairs"""
+    rng = random.Random(seed)
+    total = db.session.scalar(db.select(db.func.count(Contact.id)))
+    originals = [db.session.get(Contact, contact_id) for contact_id in rng.sample(range(1, total + 1), count)]
+    rows = [perturb(contact, rng) for contact in originals]
+    # Injected emails may collide with each other or a seeded contact
+    seen = {row[0] for row in db.session.execute(db.select(Contact.email_normalized))}
+    pairs = []
+    for contact, row in zip(originals, rows):
+        if row['email_normalized'] in seen:
+            continue
+        seen.add(row['email_normalized'])
+        duplicate = Contact(**row)
+        db.session.add(duplicate)
+        db.session.flush()
+        pairs.append((contact.id, duplicate.id))
+    db.session.commit()
+    return pairs
+
+def keys_memory():
+    """Peak bytes allocated while loading the contact keys a scan holds in memory"""
+    tracemalloc.start()
+    try:
+        load_contact_keys()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--duplicates', type=float, default=0.02, help='Injected duplicates as a share of contacts')
+    parser.add_argument('--threshold', type=float, default=app.config['DEDUP_THRESHOLD'])
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        reset_db(app)
+        with app.app_context():
+            seed_contacts(db, Contact, size)
+            injected = set(inject_duplicates(int(size * args.duplicates)))
+
+            start = time.perf_counter()
+            stats = scan_duplicates(args.threshold)
+            elapsed = time.perf_counter() - start
+
+            found = set(db.session.execute(db.select(DuplicateCandidate.contact_id, DuplicateCandidate.duplicate_id)))
+            # Measured apart from the timed scan: tracemalloc slows allocation down
+            peak = keys_memory()
+        recall = len(found & injected) / len(injected) if injected else 1.0
+        print(f'{stats["total"]:,} contacts: {elapsed:.1f}s ({stats["total"] / elapsed:,.0f}/s), '
+              f'recall {recall:.1%} of {len(injected):,} injected, {len(found - injected):,} other pairs, '
+              f'keys peak {peak / 2**20:.1f}MB ({peak / stats["total"]:.0f} bytes/contact)')
+        # Timing in the usual summary shape so compare.py can diff runs
+        results[f'{size}/scan'] = dict(
+            summarize([elapsed * 1000]),
+            recall=recall,
+            injected=len(injected),
+            other_pairs=len(found - injected),
+            keys_peak_bytes=peak
+        )
+
+    if args.json:
+        save_results(args.json, 'dedup', vars(args), results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Concurrent HTTP load driver reporting p50/p95/p99 latency per path
+
+By default it seeds a throwaway SQLite database and serves the app from a
+separate process (threaded Werkzeug server), so client and server don't
+share a GIL. Point --url at a running deployment (e.g. gunicorn) instead to
+load-test that.
+
+Usage: python benchmarks/bench_load.py [--size 100000] [--concurrency 16] [--duration 10]
+                                       [--paths /contacts /api/contacts] [--url http://host:port]
+                                       [--json results/load.json]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from fixtures import PROJECT_DIR, temp_database_url, seed_contacts
+from results import summarize, save_results, print_table
+
+DEFAULT_PATHS = [
+    '/',
+    '/contacts',
+    '/contacts?search=smith',
+    '/api/contacts?limit=50',
+    '/api/contacts?search=patel&limit=50',
+]
+
+SERVER = '''
+import logging, sys
+from werkzeug.serving import make_server
+from app import app
+logging.getLogger('werkzeug').setLevel(logging.WARNING)
+make_server('127.0.0.1', int(sys.argv[1]), app, threaded=True).serve_forever()
+'''
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(size):
+    """Seed a fresh database and serve the app from a child process; returns (process, base URL)"""
+    env = dict(
+        os.environ,
+        DATABASE_URL=temp_database_url('load'),
+        LOG_DIR=os.path.join(tempfile.gettempdir(), 'contact-manager-bench-logs'),
+        JOB_DIR=os.path.join(tempfile.gettempdir(), 'contact-manager-bench-jobs')
+    )
+    os.environ.update(env)
+    from app import app
+    from database import reset_db
+    from models import db, Contact
+    reset_db(app)
+    with app.app_context():
+        seed_contacts(db, Contact, size)
+
+    port = free_port()
+    process = subprocess.Popen([sys.executable, '-c', SERVER, str(port)], cwd=PROJECT_DIR, env=env)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(base_url + '/', timeout=1).read()
+            return process, base_url
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('Server did not start within 30s')
+
+def worker(base_url, paths, offset, stop_at, samples, errors, lock):
+    """Request paths round-robin until stop_at, recording latency per path"""
+    local = {path: [] for path in paths}
+    failed = 0
+    i = offset
+    while time.monotonic() < stop_at:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base_url + path, timeout=30) as response:
+                response.read()
+        except (urllib.error.URLError, ConnectionError):
+            failed += 1
+            continue
+        local[path].append((time.perf_counter() - start) * 1000)
+    with lock:
+        for path, values in local.items():
+            samples[path].extend(values)
+        errors[0] += failed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='Base URL of a running server (skips seeding)')
+    parser.add_argument('--size', type=int, default=100000, help='Contacts to seed for the local server')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load')
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.url.rstrip('/') if args.url else None
+    if base_url is None:
+        process, base_url = start_server(args.size)
+
+    try:
+        samples = {path: [] for path in args.paths}
+        errors = [0]
+        lock = threading.Lock()
+        stop_at = time.monotonic() + args.duration
+        threads = [
+            threading.Thread(target=worker, args=(base_url, args.paths, i, stop_at, samples, errors, lock))
+            for i in range(args.concurrency)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    results = {path: summarize(values) for path, values in samples.items() if values}
+    every = [value for values in samples.values() for value in values]
+    if every:
+        results['all'] = summarize(every)
+    total = len(every)
+    print(f'{base_url}: {args.concurrency} clients for {elapsed:.1f}s, '
+          f'{total:,} requests ({total / elapsed:,.0f} req/s), {errors[0]} errors')
+    print_table(results)
+
+    if args.json:
+        params = dict(vars(args), requests=total, errors=errors[0], requests_per_second=total / elapsed)
+        save_results(args.json, 'load', params, results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Compare OFFSET pagination with keyset (cursor) pagination at increasing depth
+
+Usage: python benchmarks/bench_pagination.py [--size 200000] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from fixtures import temp_database_url, seed_contacts
+
+os.environ['DATABASE_URL'] = temp_database_url('pagination')
+
+from app import app
+from database import reset_db
+from models import db, Contact
+from pagination import encode_cursor, paginate_keyset
+
+PER_PAGE = 10
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+        db.session.expunge_all()
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    reset_db(app)
+    with app.app_context():
+        seed_contacts(db, Contact, args.size)
+        query = Contact.query.order_by(Contact.full_name, Contact.id)
+        last_page = args.size // PER_PAGE
+
+        print(f"{'page':>8} {'offset ms':>10} {'keyset ms':>10}")
+        for page in (1, 10, 100, 1000, last_page // 2, last_page):
+            if page < 1 or page > last_page:
+                continue
+            offset_ms = median_ms(
+                lambda: query.paginate(page=page, per_page=PER_PAGE, error_out=False).items, args.repeat
+            )
+            # The cursor a user would hold after walking to the previous page
+            after = None
+            if page > 1:
+                anchor = query.offset((page - 1) * PER_PAGE - 1).first()
+                after = encode_cursor([anchor.full_name, anchor.id])
+            keyset_ms = median_ms(
+                lambda: paginate_keyset(query, Contact.full_name, Contact.id, PER_PAGE, after=after).items,
+                args.repeat
+            )
+            print(f'{page:>8} {offset_ms:>10.2f} {keyset_ms:>10.2f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Micro-benchmarks of the hot paths through Flask's test client
+
+Covers the contacts list (first page, deep keyset and offset pages),
+search, the JSON API, CSV/JSON export and CSV import at each database size,
+plus conditional GETs answered with 304 Not Modified.
+
+Usage: python benchmarks/bench_routes.py [--sizes 10000 100000] [--repeat 20] [--json results/routes.json]
+"""
+import argparse
+import io
+import os
+import time
+
+from fixtures import temp_database_url, seed_contacts, contacts_csv_bytes
+
+os.environ['DATABASE_URL'] = temp_database_url('routes')
+# Imports validate rows; keep DNS lookups out of the timings
+os.environ.setdefault('EMAIL_CHECK_DELIVERABILITY', '0')
+
+from app import app
+from database import reset_db
+from models import db, Contact
+from pagination import encode_cursor
+from cache import stats_cache
+from results import summarize, save_results, print_table
+
+# Streaming and bulk cases are much slower than page views; run fewer times
+SLOW_CASES = {'export_csv', 'export_json', 'import_csv'}
+
+def timed(client, method, url, **kwargs):
+    """Issue one request, consuming the whole (possibly streamed) body; returns ms"""
+    start = time.perf_counter()
+    response = client.open(url, method=method, **kwargs)
+    response.get_data()
+    elapsed = (time.perf_counter() - start) * 1000
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method} {url} returned {response.status_code}')
+    return elapsed
+
+def build_cases(size, import_rows):
+    """(name, method, url, kwargs factory) for each hot path"""
+    with app.app_context():
+        query = Contact.query.order_by(Contact.full_name, Contact.id)
+        middle = query.offset(size // 2).first()
+    cursor = encode_cursor([middle.full_name, middle.id])
+    middle_page = size // (2 * app.config['CONTACTS_PER_PAGE'])
+    upload = contacts_csv_bytes(import_rows, seed=7)
+
+    def no_body():
+        return {}
+
+    # What a polling client with a current copy sends
+    client = app.test_client()
+    etags = {url: client.get(url).headers['ETag'] for url in ('/contacts', '/export', '/api/contacts?limit=100')}
+
+    def revalidate(url):
+        return lambda: {'headers': {'If-None-Match': etags[url]}}
+
+    def csv_upload():
+        return {'data': {'csv_file': (io.BytesIO(upload), 'contacts.csv')}}
+
+    return [
+        ('list_first_page', 'GET', '/contacts', no_body),
+        ('list_keyset_middle', 'GET', f'/contacts?after={cursor}', no_body),
+        ('list_offset_middle', 'GET', f'/contacts?page={middle_page}', no_body),
+        ('search_name', 'GET', '/contacts?search=smith', no_body),
+        ('search_short', 'GET', '/contacts?search=li', no_body),
+        ('search_email', 'GET', '/contacts?search=example.org', no_body),
+        ('api_list', 'GET', '/api/contacts?limit=100', no_body),
+        ('api_search', 'GET', '/api/contacts?search=patel&limit=100', no_body),
+        ('export_csv', 'GET', '/export', no_body),
+        ('export_json', 'GET', '/api/contacts/export', no_body),
+        ('import_csv', 'POST', '/import-export', csv_upload),
+        ('list_not_modified', 'GET', '/contacts', revalidate('/contacts')),
+        ('export_not_modified', 'GET', '/export', revalidate('/export')),
+        ('api_list_not_modified', 'GET', '/api/contacts?limit=100', revalidate('/api/contacts?limit=100')),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--slow-repeat', type=int, default=3, help='Repeats for export/import cases')
+    parser.add_argument('--import-rows', type=int, default=5000)
+    parser.add_argument('--only', nargs='+', help='Run only these case names')
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    # Keep imports synchronous so the request time covers the whole import
+    app.config['ASYNC_IMPORT_THRESHOLD'] = float('inf')
+    client = app.test_client()
+
+    results = {}
+    for size in args.sizes:
+        reset_db(app)
+        stats_cache.invalidate()
+        with app.app_context():
+            seed_contacts(db, Contact, size)
+
+        print(f'\n{size:,} contacts')
+        size_results = {}
+        for name, method, url, body in build_cases(size, args.import_rows):
+            if args.only and name not in args.only:
+                continue
+            repeat = args.slow_repeat if name in SLOW_CASES else args.repeat
+            timed(client, method, url, **body())  # warm up caches and the query planner
+            samples = [timed(client, method, url, **body()) for _ in range(repeat)]
+            size_results[name] = summarize(samples)
+        print_table(size_results)
+        results.update({f'{size}/{name}': summary for name, summary in size_results.items()})
+
+    if args.json:
+        save_results(args.json, 'routes', vars(args), results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Compare indexed Contact.search against the legacy leading-wildcard LIKE scan
+
+Usage: python benchmarks/bench_search.py [--sizes 10000 100000 1000000] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from fixtures import temp_database_url, seed_contacts
+
+os.environ['DATABASE_URL'] = temp_database_url('search')
+
+from app import app
+from database import reset_db
+from models import db, Contact
+
+QUERIES = ['john', 'smith', 'patel', 'maria', '555', 'example.org', 'zzzz']
+
+def legacy_search(query):
+    """The pre-index implementation: OR of three %query% scans"""
+    search_pattern = f'%{query}%'
+    return Contact.query.filter(
+        db.or_(
+            Contact.full_name.ilike(search_pattern),
+            Contact.phone_number.like(search_pattern),
+            Contact.email.ilike(search_pattern)
+        )
+    ).order_by(Contact.full_name).all()
+
+def indexed_search(query):
+    """The indexed implementation, fully materialized for a fair comparison"""
+    return Contact.search(query).all()
+
+def time_queries(search, repeat):
+    """Return per-query median timings in milliseconds"""
+    timings = {}
+    for query in QUERIES:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            search(query)
+            samples.append((time.perf_counter() - start) * 1000)
+            db.session.expunge_all()
+        timings[query] = statistics.median(samples)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'query':>12} {'legacy ms':>10} {'indexed ms':>11} {'speedup':>8}")
+    for size in args.sizes:
+        reset_db(app)
+        with app.app_context():
+            seed_contacts(db, Contact, size)
+            legacy = time_queries(legacy_search, args.repeat)
+            indexed = time_queries(indexed_search, args.repeat)
+        for query in QUERIES:
+            speedup = legacy[query] / indexed[query] if indexed[query] else float('inf')
+            print(f'{size:>9} {query:>12} {legacy[query]:>10.2f} {indexed[query]:>11.2f} {speedup:>7.1f}x')
+
+if __name__ == '__main__':
+    main()
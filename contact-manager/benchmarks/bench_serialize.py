@@ -0,0 +1,60 @@
+"""Compare ORM to_dict() serialization with the column-row fast path
+
+Usage: python benchmarks/bench_serialize.py [--size 100000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from fixtures import temp_database_url, seed_contacts
+
+os.environ['DATABASE_URL'] = temp_database_url('serialize')
+
+from app import app
+from database import reset_db
+from models import db, Contact
+from serializers import contact_columns, rows_to_dicts, iter_contacts_json
+
+def orm_to_dict():
+    return json.dumps([c.to_dict() for c in Contact.query.all()])
+
+def column_rows():
+    rows = db.session.execute(db.select(*contact_columns())).all()
+    return json.dumps(rows_to_dicts(rows))
+
+def streamed_json():
+    return ''.join(iter_contacts_json())
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+        db.session.expunge_all()
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    reset_db(app)
+    with app.app_context():
+        seed_contacts(db, Contact, args.size)
+        baseline = median_ms(orm_to_dict, args.repeat)
+        print(f'{args.size} contacts, median of {args.repeat} runs')
+        print(f"{'path':<32} {'ms':>9} {'speedup':>8}")
+        for label, fn in [
+            ('[c.to_dict() for c in all()]', orm_to_dict),
+            ('column rows + rows_to_dicts', column_rows),
+            ('iter_contacts_json (streamed)', streamed_json)
+        ]:
+            ms = baseline if fn is orm_to_dict else median_ms(fn, args.repeat)
+            print(f'{label:<32} {ms:>9.1f} {baseline / ms:>7.1f}x')
+
+if __name__ == '__main__':
+    main()
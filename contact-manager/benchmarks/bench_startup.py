@@ -0,0 +1,81 @@
+"""Cold-start benchmark: import app.py, then serve the first and second request
+
+Each run is a fresh interpreter, like a serverless cold start. The first
+run against a new database includes the schema migrations; later runs
+find the schema current and skip DDL.
+
+Usage: python benchmarks/bench_startup.py [--runs 10] [--path /]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from fixtures import PROJECT_DIR, temp_database_url
+
+# Runs in the child interpreter; prints timings in milliseconds as JSON
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+from app import app
+imported = time.perf_counter()
+client = app.test_client()
+status = client.get(sys.argv[1]).status_code
+first = time.perf_counter()
+client.get(sys.argv[1])
+second = time.perf_counter()
+print(json.dumps({
+    'status': status,
+    'import': (imported - started) * 1000,
+    'first_request': (first - imported) * 1000,
+    'second_request': (second - first) * 1000,
+    'email_validator_loaded': 'email_validator' in sys.modules,
+    'utils_loaded': 'utils' in sys.modules
+}))
+'''
+
+def run_once(path, env):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, path],
+        cwd=PROJECT_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/', help='URL of the first request')
+    args = parser.parse_args()
+
+    env = dict(
+        os.environ,
+        DATABASE_URL=temp_database_url('startup'),
+        LOG_DIR=os.path.join(tempfile.gettempdir(), 'contact-manager-bench-logs'),
+        JOB_DIR=os.path.join(tempfile.gettempdir(), 'contact-manager-bench-jobs')
+    )
+
+    fresh = run_once(args.path, env)
+    runs = [run_once(args.path, env) for _ in range(args.runs)]
+
+    print(f'GET {args.path}, {args.runs} cold starts (times in ms)')
+    print(f"{'':<24} {'import':>8} {'1st req':>8} {'2nd req':>8}")
+    print(f"{'new database':<24} {fresh['import']:>8.1f} {fresh['first_request']:>8.1f} {fresh['second_request']:>8.1f}")
+    print(
+        f"{'migrated (median)':<24} "
+        f"{statistics.median(r['import'] for r in runs):>8.1f} "
+        f"{statistics.median(r['first_request'] for r in runs):>8.1f} "
+        f"{statistics.median(r['second_request'] for r in runs):>8.1f}"
+    )
+    last = runs[-1]
+    print(f"status {last['status']}; email_validator loaded: {last['email_validator_loaded']}; "
+          f"CSV utils loaded: {last['utils_loaded']}")
+
+if __name__ == '__main__':
+    main()
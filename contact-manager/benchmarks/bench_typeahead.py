@@ -0,0 +1,83 @@
+"""Latency of /api/contacts/typeahead as a user types, with and without the result cache
+
+Each "user" types a seeded name or email one character at a time; every
+prefix is one request. The uncached run clears the cache before each
+request, so it measures the index lookups themselves.
+
+Usage: python benchmarks/bench_typeahead.py [--sizes 100000 1000000] [--users 200] [--json results/typeahead.json]
+"""
+import argparse
+import os
+import random
+import time
+from urllib.parse import quote
+
+from fixtures import temp_database_url, seed_contacts, generate_contacts
+
+os.environ['DATABASE_URL'] = temp_database_url('typeahead')
+
+from app import app
+from database import reset_db
+from models import db, Contact
+from typeahead import typeahead
+from results import summarize, save_results, print_table
+
+def keystrokes(users, seed=3):
+    """Prefixes typed by `users` people looking up seeded names and emails"""
+    rng = random.Random(seed)
+    samples = list(generate_contacts(1000, seed=42))
+    prefixes = []
+    for _ in range(users):
+        contact = rng.choice(samples)
+        text = contact['full_name'] if rng.random() < 0.7 else contact['email']
+        prefixes += [text[:length] for length in range(1, min(len(text), 10) + 1)]
+    return prefixes
+
+# Inputs that once broke the endpoint; each must still answer 200
+EDGE_QUERIES = ['\U0010ffff', 'a\U0010ffff', '\U0010ffff\U0010ffff', '%', '_', ' ']
+
+def check_edge_queries(client):
+    for query in EDGE_QUERIES:
+        response = client.get(f'/api/contacts/typeahead?q={quote(query)}')
+        assert response.status_code == 200, f'{query!r}: {response.status_code}'
+
+def run(client, prefixes, cached):
+    samples = []
+    for prefix in prefixes:
+        if not cached:
+            typeahead.cache.clear()
+        start = time.perf_counter()
+        response = client.get(f'/api/contacts/typeahead?q={quote(prefix)}')
+        response.get_data()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    client = app.test_client()
+    prefixes = keystrokes(args.users)
+    results = {}
+    for size in args.sizes:
+        reset_db(app)
+        with app.app_context():
+            seed_contacts(db, Contact, size)
+        client.get('/api/contacts/typeahead?q=a')  # first-request schema check
+        check_edge_queries(client)
+
+        size_results = {'uncached': run(client, prefixes, cached=False)}
+        run(client, prefixes, cached=True)  # fill the cache
+        size_results['cached'] = run(client, prefixes, cached=True)
+        print(f'\n{size:,} contacts, {len(prefixes):,} keystrokes')
+        print_table(size_results)
+        results.update({f'{size}/{name}': summary for name, summary in size_results.items()})
+
+    if args.json:
+        save_results(args.json, 'typeahead', vars(args), results)
+
+if __name__ == '__main__':
+    main()
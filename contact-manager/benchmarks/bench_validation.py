@@ -0,0 +1,85 @@
+"""Measure bulk row validation: per-row ContactForm vs BulkValidator (cached, pooled)
+
+DNS deliverability checks are off so results don't depend on the network;
+with them on, BulkValidator does one lookup per distinct domain instead of
+one per row.
+
+Usage: python benchmarks/bench_validation.py [--rows 100000] [--workers 4]
+"""
+import argparse
+import time
+
+from fixtures import generate_contacts
+
+import forms
+from forms import BulkValidator, ContactForm, FORM_FIELDS, _check_email_syntax, _check_domain
+
+def per_row(rows):
+    """The form path: one uncached email_validator call per row"""
+    from email_validator import validate_email, EmailNotValidError
+    results = []
+    for row in rows:
+        form = ContactForm({field: row.get(field) or '' for field in FORM_FIELDS}, check_deliverability=False)
+        form._validate_full_name()
+        form._validate_phone_number()
+        try:
+            validate_email(row['email'], check_deliverability=False)
+        except EmailNotValidError as e:
+            form.errors['email'] = str(e)
+        results.append(form.errors)
+    return results
+
+def reset_caches(workers):
+    """Empty the in-process caches and restart the pool, so every run starts cold"""
+    _check_email_syntax.cache_clear()
+    _check_domain.cache_clear()
+    for pool in forms._pools.values():
+        pool.shutdown()
+    forms._pools.clear()
+    if workers:
+        # Start the worker processes outside the timing, on rows not used below
+        BulkValidator(check_deliverability=False, workers=workers).validate(
+            list(generate_contacts(2 * forms.MIN_ROWS_PER_TASK * workers, seed=1))
+        )
+
+def timed(fn, rows, workers=0):
+    reset_caches(workers)
+    start = time.perf_counter()
+    results = fn(rows)
+    elapsed = time.perf_counter() - start
+    assert not any(results), 'synthetic rows should all be valid'
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--chunk', type=int, default=5000, help='Rows per validate() call')
+    args = parser.parse_args()
+
+    rows = list(generate_contacts(args.rows))
+    # Real files repeat addresses (re-imports, duplicates); half of these do
+    repeated = rows[:args.rows // 2] * 2
+
+    def chunked(validator):
+        def run(rows):
+            results = []
+            for i in range(0, len(rows), args.chunk):
+                results.extend(validator.validate(rows[i:i + args.chunk]))
+            return results
+        return run
+
+    cases = [
+        ('per-row form validation', per_row, 0),
+        ('BulkValidator, 1 process', chunked(BulkValidator(check_deliverability=False)), 0),
+        (f'BulkValidator, {args.workers} processes',
+         chunked(BulkValidator(check_deliverability=False, workers=args.workers)), args.workers),
+    ]
+    print(f"{'':<28} {'unique rows/s':>14} {'50% repeats rows/s':>19}")
+    for name, fn, workers in cases:
+        unique_s = timed(fn, rows, workers)
+        repeated_s = timed(fn, repeated, workers)
+        print(f'{name:<28} {len(rows) / unique_s:>14,.0f} {len(repeated) / repeated_s:>19,.0f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Compare two benchmark result files and flag regressions
+
+Usage: python benchmarks/compare.py baseline.json candidate.json [--metric p50] [--threshold 10]
+
+Exits with status 1 when any case common to both files got slower by more
+than --threshold percent, so it can gate a CI job.
+"""
+import argparse
+import sys
+
+from results import load_results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--metric', default='p50', choices=['p50', 'p95', 'p99', 'mean', 'min', 'max'])
+    parser.add_argument('--threshold', type=float, default=10.0, help='Allowed slowdown in percent')
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    candidate = load_results(args.candidate)
+    if baseline['suite'] != candidate['suite']:
+        print(f"warning: comparing suite {baseline['suite']!r} with {candidate['suite']!r}")
+    print(f"baseline  {baseline.get('git_revision') or '?'} ({baseline['created_at']})")
+    print(f"candidate {candidate.get('git_revision') or '?'} ({candidate['created_at']})")
+
+    cases = [case for case in baseline['results'] if case in candidate['results']]
+    if not cases:
+        print('No cases in common.')
+        return 0
+
+    width = max(len(case) for case in cases)
+    print(f"\n{'case':<{width}} {'before ms':>10} {'after ms':>10} {'change':>8}")
+    regressions = 0
+    for case in cases:
+        before = baseline['results'][case][args.metric]
+        after = candidate['results'][case][args.metric]
+        change = (after - before) / before * 100 if before else 0.0
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif change < -args.threshold:
+            flag = '  faster'
+        print(f'{case:<{width}} {before:>10.2f} {after:>10.2f} {change:>+7.1f}%{flag}')
+
+    skipped = set(baseline['results']) ^ set(candidate['results'])
+    if skipped:
+        print(f'\n{len(skipped)} cases only present in one file were skipped')
+    print(f'\n{regressions} regression(s) beyond {args.threshold:g}% on {args.metric}')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Seeded synthetic contact data shared by the benchmark scripts"""
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+# Every benchmark imports this module before the app, so its logs and job
+# files land in the temp directory instead of the source tree
+os.environ.setdefault('LOG_DIR', os.path.join(tempfile.gettempdir(), 'contact-manager-bench-logs'))
+os.environ.setdefault('JOB_DIR', os.path.join(tempfile.gettempdir(), 'contact-manager-bench-jobs'))
+
+FIRST_NAMES = [
+    'James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda',
+    'William', 'Elizabeth', 'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica',
+    'Thomas', 'Sarah', 'Charles', 'Karen', 'Priya', 'Arjun', 'Wei', 'Yuki', 'Omar',
+    'Fatima', 'Carlos', 'Sofia', 'Ivan', 'Anya', 'Kwame', 'Amara', 'Lars', 'Ingrid'
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+    'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson',
+    'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin', 'Sharma', 'Patel', 'Chen', 'Tanaka',
+    'Haddad', 'Okafor', 'Silva', 'Petrov', 'Nielsen', 'Mensah', 'Kowalski', 'Schmidt'
+]
+# Reserved example domains: valid syntax, never deliverable
+DOMAINS = ['example.com', 'example.org', 'example.net', 'mail.example.com', 'corp.example.org']
+COMPANIES = ['Acme Corp', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries', None, None]
+STREETS = ['Main St', 'Oak Ave', 'Pine Rd', 'Maple Dr', 'Cedar Ln', 'Elm St']
+
+FIELDNAMES = ['full_name', 'phone_number', 'email', 'address', 'company', 'notes']
+
+def generate_contacts(count, seed=42):
+    """Yield `count` reproducible contact dicts with unique emails"""
+    rng = random.Random(seed)
+    for i in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        yield {
+            'full_name': f'{first} {last}',
+            'phone_number': f'+1 ({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}',
+            'email': f'{first}.{last}.{i}@{rng.choice(DOMAINS)}'.lower(),
+            'address': f'{rng.randint(1, 9999)} {rng.choice(STREETS)}',
+            'company': rng.choice(COMPANIES),
+            'notes': None
+        }
+
+def temp_database_url(name):
+    """Return a SQLite URL for a fresh database file in the temp directory"""
+    path = os.path.join(tempfile.gettempdir(), f'contact-bench-{name}.db')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return f'sqlite:///{path}'
+
+def seed_contacts(db, Contact, count, seed=42, batch_size=10000):
+    """Bulk insert `count` synthetic contacts"""
+    from models import normalize_email, normalize_name, normalize_phone
+    batch = []
+    for row in generate_contacts(count, seed):
+        row['email_normalized'] = normalize_email(row['email'])
+        row['name_normalized'] = normalize_name(row['full_name'])
+        row['phone_normalized'] = normalize_phone(row['phone_number'])
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(db.insert(Contact), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(Contact), batch)
+    db.session.commit()
+
+def write_contacts_csv(path, count, seed=42):
+    """Stream `count` synthetic contacts to a CSV file without holding them in memory"""
+    with open(path, 'w', encoding='utf-8', newline='') as output:
+        writer = csv.DictWriter(output, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for row in generate_contacts(count, seed):
+            writer.writerow(row)
+
+def contacts_csv_bytes(count, seed=42):
+    """Render `count` synthetic contacts as an in-memory CSV upload"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=FIELDNAMES)
+    writer.writeheader()
+    for row in generate_contacts(count, seed):
+        writer.writerow(row)
+    return output.getvalue().encode('utf-8')
@@ -0,0 +1,34 @@
+"""Write seeded synthetic contact CSV files for imports and load tests
+
+Usage: python benchmarks/generate.py [--counts 10000 100000 1000000] [--seed 42] [--out-dir benchmarks/data]
+"""
+import argparse
+import os
+import time
+
+from fixtures import BENCH_DIR, write_contacts_csv
+
+def label(count):
+    if count % 1000000 == 0:
+        return f'{count // 1000000}m'
+    if count % 1000 == 0:
+        return f'{count // 1000}k'
+    return str(count)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counts', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out-dir', default=os.path.join(BENCH_DIR, 'data'))
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for count in args.counts:
+        path = os.path.join(args.out_dir, f'contacts_{label(count)}_seed{args.seed}.csv')
+        start = time.perf_counter()
+        write_contacts_csv(path, count, args.seed)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f'{path}: {count:,} rows, {size_mb:.1f}MB in {time.perf_counter() - start:.1f}s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Latency summaries and JSON result files shared by the benchmark scripts"""
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+from fixtures import PROJECT_DIR
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return None
+    rank = max(1, -(-len(sorted_samples) * pct // 100))
+    return sorted_samples[int(rank) - 1]
+
+def summarize(samples):
+    """p50/p95/p99/mean/min/max of a list of timings (milliseconds)"""
+    ordered = sorted(samples)
+    return {
+        'n': len(ordered),
+        'p50': percentile(ordered, 50),
+        'p95': percentile(ordered, 95),
+        'p99': percentile(ordered, 99),
+        'mean': sum(ordered) / len(ordered) if ordered else None,
+        'min': ordered[0] if ordered else None,
+        'max': ordered[-1] if ordered else None
+    }
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def save_results(path, suite, params, results):
+    """Write a result file that compare.py can diff against another run"""
+    document = {
+        'suite': suite,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': _git_revision(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'params': params,
+        'results': results
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(document, output, indent=2)
+    print(f'Results written to {path}')
+
+def load_results(path):
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
+
+def print_table(results, columns=('p50', 'p95', 'p99')):
+    """Print {case: summary} as an aligned table of milliseconds"""
+    width = max([len(case) for case in results] + [4])
+    print(f"{'case':<{width}} {'n':>6} " + ' '.join(f'{column + " ms":>10}' for column in columns))
+    for case, summary in results.items():
+        values = ' '.join(f'{summary[column]:>10.2f}' for column in columns)
+        print(f"{case:<{width}} {summary['n']:>6} {values}")
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+import uuid
+from werkzeug.utils import import_string
+from models import db, Contact
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Thread-safe in-process key/value cache with per-entry expiry
+
+    Any object with the same get/set/delete/incr methods (e.g. a thin Redis
+    wrapper) can be plugged in through the STATS_CACHE_BACKEND setting.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def incr(self, key, delta):
+        """Adjust a cached number in place; a missing key stays missing"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data[key] = (entry[0] + delta, entry[1])
+
+class StatsCache:
+    """Aggregate contact statistics, cached with a TTL and kept correct on writes
+
+    Writes in this process adjust the total incrementally and drop the
+    per-company breakdown. Other worker processes see changes once their
+    TTL expires, unless a shared backend is configured.
+
+    Every write also stores a new generation token. A value computed while
+    the generation changed may miss that write (its incr found nothing to
+    adjust), so it is dropped instead of cached.
+    """
+
+    TOTAL_KEY = 'contacts:total'
+    COMPANIES_KEY = 'contacts:companies'
+    GENERATION_KEY = 'contacts:generation'
+    TOP_COMPANIES = 5
+
+    def __init__(self, app=None):
+        self.backend = TTLCache()
+        self.ttl = 300
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('STATS_CACHE_BACKEND')
+        self.backend = import_string(backend)() if backend else TTLCache()
+        self.ttl = app.config['STATS_CACHE_TTL']
+        app.extensions['stats_cache'] = self
+
+    def _get_or_compute(self, key, compute):
+        value = self.backend.get(key)
+        if value is None:
+            generation = self.backend.get(self.GENERATION_KEY)
+            value = compute()
+            self.backend.set(key, value, self.ttl)
+            if self.backend.get(self.GENERATION_KEY) != generation:
+                self.backend.delete(key)
+        return value
+
+    def total_contacts(self):
+        """Number of contacts"""
+        return self._get_or_compute(self.TOTAL_KEY, lambda: Contact.query.count())
+
+    def top_companies(self):
+        """[(company, contact count), ...] for the companies with the most contacts"""
+        def compute():
+            count = db.func.count(Contact.id)
+            rows = db.session.execute(
+                db.select(Contact.company, count)
+                .where(Contact.company.isnot(None))
+                .group_by(Contact.company)
+                .order_by(count.desc(), Contact.company)
+                .limit(self.TOP_COMPANIES)
+            ).all()
+            return [tuple(row) for row in rows]
+        return self._get_or_compute(self.COMPANIES_KEY, compute)
+
+    def contacts_added(self, count=1):
+        self._new_generation()
+        self.backend.incr(self.TOTAL_KEY, count)
+        self._companies_changed()
+
+    def contacts_deleted(self, count=1):
+        self._new_generation()
+        self.backend.incr(self.TOTAL_KEY, -count)
+        self._companies_changed()
+
+    def contacts_updated(self):
+        self._new_generation()
+        self._companies_changed()
+
+    def _new_generation(self):
+        self.backend.set(self.GENERATION_KEY, uuid.uuid4().hex, self.ttl)
+
+    def _companies_changed(self):
+        self.backend.delete(self.COMPANIES_KEY)
+
+    def invalidate(self):
+        """Drop every cached statistic"""
+        self._new_generation()
+        self.backend.delete(self.TOTAL_KEY, self.COMPANIES_KEY)
+
+stats_cache = StatsCache()
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+from models import db, Contact, ContactTombstone, format_timestamp
+from pagination import encode_cursor, decode_cursor
+from serializers import contact_columns, rows_to_dicts
+
+class CursorExpired(ValueError):
+    """The cursor predates the oldest kept tombstone; the client must resync"""
+
+class ChangePage:
+    """One page of the change feed"""
+
+    def __init__(self, changes, cursor, has_more):
+        self.changes = changes
+        self.cursor = cursor
+        self.has_more = has_more
+
+def _encode_position(position):
+    if position is None:
+        return [None, None]
+    timestamp, row_id = position
+    return [timestamp.isoformat(), row_id]
+
+def _decode_position(values):
+    timestamp, row_id = values
+    if timestamp is None:
+        return None
+    if not isinstance(timestamp, str) or (row_id is not None and not isinstance(row_id, int)):
+        raise ValueError('Invalid cursor: bad position')
+    return datetime.fromisoformat(timestamp), row_id
+
+def parse_since(since, now):
+    """(contacts position, tombstones position) to resume from
+
+    `since` is a cursor from a previous page, an ISO timestamp, or empty for
+    a full sync: every contact, plus deletions from now on.
+    """
+    if not since:
+        return None, (now, None)
+    try:
+        timestamp = datetime.fromisoformat(since)
+    except ValueError:
+        values = decode_cursor(since)
+        if len(values) != 4:
+            raise ValueError('Invalid cursor: expected four values')
+        return _decode_position(values[:2]), _decode_position(values[2:])
+    if timestamp.tzinfo is not None:
+        # Stored timestamps are naive UTC
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp, None), (timestamp, None)
+
+def _after(timestamp_column, id_column, position):
+    """Rows past a (timestamp, id) position; id None means past the whole timestamp"""
+    timestamp, row_id = position
+    if row_id is None:
+        return timestamp_column > timestamp
+    return db.and_(
+        timestamp_column >= timestamp,
+        db.or_(timestamp_column > timestamp, id_column > row_id)
+    )
+
+def changes_since(since, limit, settle_seconds, retention_days):
+    """Contacts created/updated and deleted after `since`, oldest first
+
+    Two keyset scans, on (updated_at, id) and on the tombstones'
+    (deleted_at, id), merged by time. Each stream's position is kept in the
+    cursor; a stream with nothing left moves up to the settle horizon, so
+    idle polls stay cheap and cursors don't age while nothing changes.
+    """
+    now = datetime.utcnow()
+    horizon = now - timedelta(seconds=settle_seconds)
+    contacts_position, deletes_position = parse_since(since, horizon)
+    if deletes_position is not None and deletes_position[0] < now - timedelta(days=retention_days):
+        raise CursorExpired('Cursor is older than the kept deletion history; start a full sync without `since`.')
+
+    statement = db.select(*contact_columns(), Contact.updated_at.label('changed_at')).where(
+        Contact.updated_at <= horizon
+    )
+    if contacts_position is not None:
+        statement = statement.where(_after(Contact.updated_at, Contact.id, contacts_position))
+    contact_rows = db.session.execute(
+        statement.order_by(Contact.updated_at, Contact.id).limit(limit + 1)
+    ).all()
+
+    statement = db.select(ContactTombstone).where(ContactTombstone.deleted_at <= horizon)
+    if deletes_position is not None:
+        statement = statement.where(_after(ContactTombstone.deleted_at, ContactTombstone.id, deletes_position))
+    tombstones = db.session.scalars(
+        statement.order_by(ContactTombstone.deleted_at, ContactTombstone.id).limit(limit + 1)
+    ).all()
+
+    merged = sorted(
+        [(row.changed_at, 0, row.id, row) for row in contact_rows]
+        + [(tombstone.deleted_at, 1, tombstone.id, tombstone) for tombstone in tombstones],
+        key=lambda entry: entry[:3]
+    )
+    page = merged[:limit]
+    has_more = len(merged) > limit
+
+    contacts = [entry[3] for entry in page if entry[1] == 0]
+    deletes = [entry[3] for entry in page if entry[1] == 1]
+    if contacts:
+        contacts_position = (contacts[-1].changed_at, contacts[-1].id)
+    if deletes:
+        deletes_position = (deletes[-1].deleted_at, deletes[-1].id)
+    # A stream that was read to the end is caught up to the horizon
+    if len(contacts) == len(contact_rows):
+        contacts_position = (horizon, None)
+    if len(deletes) == len(tombstones):
+        deletes_position = (horizon, None)
+
+    changes = []
+    contact_dicts = iter(rows_to_dicts(contacts))
+    for entry in page:
+        if entry[1] == 0:
+            changes.append({'op': 'upsert', 'contact': next(contact_dicts)})
+        else:
+            changes.append({'op': 'delete', 'id': entry[3].contact_id, 'deleted_at': format_timestamp(entry[3].deleted_at)})
+    cursor = encode_cursor(_encode_position(contacts_position) + _encode_position(deletes_position))
+    return ChangePage(changes, cursor, has_more)
@@ -16,11 +16,38 @@ class Config:
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Apply pending schema migrations at startup. Set AUTO_MIGRATE=0 where
+    # deploys run `flask db upgrade` themselves; a current schema is never
+    # touched either way.
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', '1') != '0'
+    
+    # 'performance' applies the tuning below on connect; 'default' leaves
+    # the driver defaults untouched
+    DB_PROFILE = os.environ.get('DB_PROFILE') or 'performance'
+    
+    # Applied to every new SQLite connection under the performance profile
+    SQLITE_PRAGMAS = {
+        'busy_timeout': 5000,         # wait up to 5s for a lock (set first)
+        'journal_mode': 'WAL',        # readers don't block the writer
+        'synchronous': 'NORMAL',      # fsync at checkpoints, not every commit
+        'cache_size': -64000,         # 64MB page cache (negative = KiB)
+        'mmap_size': 268435456,       # 256MB memory-mapped reads
+        'temp_store': 'MEMORY'
+    }
+    
+    # Connection pool for MySQL/Postgres under the performance profile
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 10)
+    DB_MAX_OVERFLOW = 20
+    DB_POOL_RECYCLE = 1800  # seconds
+    
     # Secret key for sessions and CSRF protection
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     
     # Pagination
     CONTACTS_PER_PAGE = 10
+    # 'keyset' pages the unfiltered list with cursors (constant cost per page),
+    # 'offset' uses classic ?page=N links. Search results always use offsets.
+    CONTACTS_PAGINATION = os.environ.get('CONTACTS_PAGINATION') or 'keyset'
     
     # Logging - use /tmp/logs on Vercel (read-only filesystem), logs/ locally
     # Check environment variable first, then fallback to /tmp/logs if on Vercel, else local logs
@@ -34,7 +61,93 @@ class Config:
         LOG_DIR = os.path.join(BASE_DIR, 'logs')
     LOG_FILE = os.path.join(LOG_DIR, 'app.log')
     LOG_LEVEL = 'INFO'
+    # 'text' or 'json' (one object per line) for the log file
+    LOG_FORMAT = os.environ.get('LOG_FORMAT') or 'text'
+    # At most LOG_REPEAT_LIMIT records with the same message template per
+    # LOG_REPEAT_PERIOD seconds; the rest are counted and dropped
+    LOG_REPEAT_LIMIT = 20
+    LOG_REPEAT_PERIOD = 60
+    
+    # Instrumentation - per-route latency and SQL metrics served at /metrics,
+    # plus a warning for every statement slower than SLOW_QUERY_MS
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS') or 200)
+    # cProfile requests: 'off', 'header' (only requests sent with X-Profile: 1)
+    # or 'all'. Profiles are written to PROFILE_DIR as .prof files.
+    PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS') or 'off'
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(LOG_DIR, 'profiles')
+    
+    # HTTP caching - contact pages, lists and exports carry ETags and answer
+    # conditional GETs with 304 Not Modified while the data is unchanged
+    HTTP_CACHE_CONTROL = 'private, no-cache'  # personal data; always revalidate
+    # gzip (or brotli, if installed) HTML, CSV and JSON responses of at least
+    # COMPRESS_MIN_SIZE bytes; turn off when a proxy already compresses
+    COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', '1') != '0'
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 6
     
     # Upload settings
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    # Imports are streamed, so memory use does not grow with this limit
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_UPLOAD_MB') or 16) * 1024 * 1024  # 16MB default
     ALLOWED_EXTENSIONS = {'csv'}
+    # CSV rows written (and committed) per batch during import
+    IMPORT_CHUNK_SIZE = 500
+    # Check imported rows with the contact form rules. IMPORT_VALIDATION_WORKERS
+    # > 0 spreads that over a process pool (not useful on serverless hosts).
+    IMPORT_VALIDATE = os.environ.get('IMPORT_VALIDATE', '1') != '0'
+    IMPORT_VALIDATION_WORKERS = int(os.environ.get('IMPORT_VALIDATION_WORKERS') or 0)
+    # DNS check that an email's domain accepts mail, for forms, the API and
+    # imports (results are cached per domain). Turn off when working offline.
+    EMAIL_CHECK_DELIVERABILITY = os.environ.get('EMAIL_CHECK_DELIVERABILITY', '1') != '0'
+    # Contacts serialized per chunk of the streamed CSV export
+    EXPORT_BATCH_SIZE = 1000
+    
+    # Duplicate finder - pairs scoring at least DEDUP_THRESHOLD (0-1, from
+    # name, phone and email similarity) are queued for review
+    DEDUP_THRESHOLD = float(os.environ.get('DEDUP_THRESHOLD') or 0.7)
+    
+    # Cached aggregate stats (home page, list totals). STATS_CACHE_BACKEND may
+    # name a class with get/set/delete/incr methods; defaults to in-process.
+    STATS_CACHE_TTL = 300
+    STATS_CACHE_BACKEND = os.environ.get('STATS_CACHE_BACKEND')
+    
+    # JSON API
+    API_PAGE_SIZE = 50
+    API_MAX_PAGE_SIZE = 500
+    API_MAX_BATCH_SIZE = 1000  # contacts per batch create/update/delete
+    
+    # Search-as-you-type (/api/contacts/typeahead): results per request and
+    # prefixes cached per process
+    TYPEAHEAD_LIMIT = 8
+    TYPEAHEAD_MAX_LIMIT = 20
+    TYPEAHEAD_CACHE_SIZE = 4096
+    
+    # Change feed (/api/changes). Changes newer than CHANGES_SETTLE_SECONDS are
+    # held back so transactions still committing can't be skipped by a cursor;
+    # tombstones of deleted contacts are kept CHANGES_RETENTION_DAYS, and
+    # older cursors must resync from scratch.
+    CHANGES_SETTLE_SECONDS = 5
+    CHANGES_RETENTION_DAYS = int(os.environ.get('CHANGES_RETENTION_DAYS') or 30)
+    
+    # Background jobs - uploads larger than ASYNC_IMPORT_THRESHOLD bytes are
+    # imported on a worker thread. JOB_WORKERS = 0 runs jobs inline instead,
+    # the default on Vercel, which freezes background threads after each response.
+    if os.environ.get('JOB_WORKERS'):
+        JOB_WORKERS = int(os.environ.get('JOB_WORKERS'))
+    elif os.environ.get('VERCEL') or '/var/task' in BASE_DIR:
+        JOB_WORKERS = 0
+    else:
+        JOB_WORKERS = 2
+    ASYNC_IMPORT_THRESHOLD = 1024 * 1024  # 1MB
+    JOB_PROGRESS_INTERVAL = 0.5  # seconds between progress writes
+    # Job files (exports hold personal data) are deleted JOB_RETENTION_HOURS
+    # after they were written. Jobs still queued or running after
+    # JOB_STALE_HOURS were cut off by a crash or restart and are marked failed.
+    JOB_RETENTION_HOURS = int(os.environ.get('JOB_RETENTION_HOURS') or 24)
+    JOB_STALE_HOURS = 6
+    if os.environ.get('JOB_DIR'):
+        JOB_DIR = os.environ.get('JOB_DIR')
+    elif os.environ.get('VERCEL') or '/var/task' in BASE_DIR:
+        JOB_DIR = '/tmp/jobs'
+    else:
+        JOB_DIR = os.path.join(BASE_DIR, 'jobs')
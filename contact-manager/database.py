@@ -1,25 +1,111 @@
+import atexit
 import logging
+import threading
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from models import db
+from migrations import current_version, latest_version, upgrade, downgrade_all
+from jobs import job_manager
 
 logger = logging.getLogger(__name__)
 
+def engine_options(app):
+    """SQLAlchemy engine options for the configured database and DB_PROFILE"""
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if app.config['DB_PROFILE'] != 'performance':
+        return options
+    
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'sqlite':
+        # Client/server databases: bounded pool, drop dead connections before use
+        options.setdefault('pool_size', app.config['DB_POOL_SIZE'])
+        options.setdefault('max_overflow', app.config['DB_MAX_OVERFLOW'])
+        options.setdefault('pool_recycle', app.config['DB_POOL_RECYCLE'])
+        options.setdefault('pool_pre_ping', True)
+    return options
+
+def _set_sqlite_pragmas(pragmas):
+    """Return a connect listener applying PRAGMAs to each new SQLite connection"""
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+    return on_connect
+
+def _optimize_sqlite(engine):
+    """Let SQLite refresh query planner statistics before the process exits"""
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql('PRAGMA optimize')
+    except Exception as e:
+        # Best effort: another worker may hold the write lock at shutdown
+        logger.info(f'PRAGMA optimize skipped: {str(e)}')
+
+def configure_db(app):
+    """Bind the database to the app, applying the DB_PROFILE tuning
+    
+    The performance profile puts SQLite in WAL mode with synchronous=NORMAL,
+    a larger page cache, memory-mapped I/O and a busy timeout, so concurrent
+    workers wait for locks instead of failing and commits avoid a full fsync.
+    """
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app)
+    db.init_app(app)
+    
+    if app.config['DB_PROFILE'] != 'performance':
+        return
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _set_sqlite_pragmas(app.config['SQLITE_PRAGMAS']))
+            atexit.register(_optimize_sqlite, engine)
+            logger.info('SQLite performance profile enabled')
+
 def init_db(app):
-    """Initialize database"""
+    """Bring the schema up to date, or skip DDL entirely when it already is
+    
+    A current database costs one SELECT on the schema_version table. With
+    AUTO_MIGRATE off, pending migrations are only reported; apply them with
+    `flask db upgrade` during deploys instead of on cold start.
+    """
     with app.app_context():
         try:
-            # Create all tables
-            db.create_all()
-            logger.info('Database initialized successfully')
+            version = current_version(db.engine)
+            if version >= latest_version():
+                logger.info(f'Database schema is current (version {version})')
+            elif app.config['AUTO_MIGRATE']:
+                upgrade(db.engine)
+                logger.info(f'Database migrated from version {version} to {latest_version()}')
+            else:
+                logger.warning(
+                    f'Database schema is at version {version}, latest is {latest_version()}; '
+                    'run `flask db upgrade`'
+                )
         except Exception as e:
             logger.error(f'Error initializing database: {str(e)}')
             raise
 
+def init_db_on_first_request(app):
+    """Run init_db before the first request instead of at import time"""
+    lock = threading.Lock()
+    state = {'ready': False}
+    
+    @app.before_request
+    def ensure_db():
+        if state['ready']:
+            return
+        with lock:
+            if not state['ready']:
+                init_db(app)
+                job_manager.cleanup()
+                state['ready'] = True
+
 def reset_db(app):
     """Reset database (use with caution!)"""
     with app.app_context():
         try:
-            db.drop_all()
-            db.create_all()
+            downgrade_all(db.engine)
+            upgrade(db.engine)
             logger.warning('Database reset completed')
         except Exception as e:
             logger.error(f'Error resetting database: {str(e)}')
@@ -0,0 +1,284 @@
+import logging
+import re
+import time
+from datetime import datetime
+from difflib import SequenceMatcher
+import click
+from flask.cli import AppGroup
+from models import db, Contact, DuplicateCandidate, normalize_email
+
+logger = logging.getLogger(__name__)
+
+# Pairs scoring at least this much are stored for review
+DEFAULT_THRESHOLD = 0.7
+
+# Blocks up to this size are compared all-pairs; larger ones (a shared
+# office phone, a common name) only compare neighbours in name order
+MAX_BLOCK_SIZE = 50
+WINDOW_SIZE = 8
+
+# Score = NAME_WEIGHT * name similarity + ID_WEIGHT * best phone/email
+# match + BOTH_WEIGHT * the other one. A shared name alone (0.5) never
+# reaches the default threshold; a name plus a matching phone or email does.
+NAME_WEIGHT = 0.5
+ID_WEIGHT = 0.4
+BOTH_WEIGHT = 0.1
+
+# Contacts read from the database per round trip while scanning
+SCAN_BATCH_SIZE = 10000
+
+_NON_LETTERS = re.compile(r'[^a-z ]+')
+
+_SOUNDEX_CODES = {}
+for _letters, _code in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'), ('l', '4'), ('mn', '5'), ('r', '6')):
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _code
+
+def soundex(word):
+    """American Soundex code of a lowercase word, e.g. 'robert' -> 'R163'"""
+    if not word:
+        return ''
+    code = word[0].upper()
+    previous = _SOUNDEX_CODES.get(word[0], '')
+    for letter in word[1:]:
+        digit = _SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if letter not in 'hw':
+            # h/w don't separate letters with the same code; vowels do
+            previous = digit
+    return code.ljust(4, '0')
+
+def name_key(name):
+    """Lowercase letters only, tokens sorted, so 'Smith, John' == 'john smith'"""
+    tokens = _NON_LETTERS.sub(' ', (name or '').lower()).split()
+    return ' '.join(sorted(tokens))
+
+def email_local_key(email):
+    """Local part without dots or +tags: 'J.Smith+work@x.com' -> 'jsmith'"""
+    local = (email or '').lower().split('@', 1)[0].split('+', 1)[0].replace('.', '')
+    return local or None
+
+class ContactKey:
+    """The fields of a contact that blocking and scoring look at"""
+
+    __slots__ = ('id', 'name', 'phone', 'email_local')
+
+    def __init__(self, contact_id, full_name, phone_normalized, email):
+        self.id = contact_id
+        self.name = name_key(full_name)
+        digits = (phone_normalized or '').lstrip('+')
+        # Last 10 digits: '+1 555 123 4567' and '555-123-4567' agree
+        self.phone = digits[-10:] if len(digits) >= 7 else None
+        self.email_local = email_local_key(email)
+
+    def blocking_keys(self):
+        """Keys that put this contact in the same block as its likely duplicates"""
+        keys = []
+        if self.phone:
+            keys.append(('phone', self.phone))
+        if self.email_local and len(self.email_local) >= 3:
+            keys.append(('email', self.email_local))
+        tokens = self.name.split()
+        if tokens:
+            keys.append(('name', f'{soundex(tokens[0])} {soundex(tokens[-1])}'))
+        return keys
+
+def _id_matches(a, b):
+    """(phone, email) match strengths in [0, 1]; cheap string comparisons only"""
+    phone = 0.0
+    if a.phone and b.phone:
+        if a.phone == b.phone:
+            phone = 1.0
+        elif a.phone[-7:] == b.phone[-7:]:
+            # Same local number, different or missing area code
+            phone = 0.5
+    # Email names are compared exactly: 'jsmith12' and 'jsmith13' are different people
+    email = 1.0 if a.email_local and a.email_local == b.email_local else 0.0
+    return phone, email
+
+def _id_score(phone, email):
+    return ID_WEIGHT * max(phone, email) + BOTH_WEIGHT * min(phone, email)
+
+def score_pair(a, b):
+    """Similarity of two contacts in [0, 1] and a short explanation"""
+    phone, email = _id_matches(a, b)
+    if a.name == b.name:
+        name = 1.0 if a.name else 0.0
+    else:
+        name = SequenceMatcher(None, a.name, b.name).ratio()
+
+    reasons = [f'name {name:.2f}']
+    if phone == 1.0:
+        reasons.append('same phone')
+    elif phone:
+        reasons.append('phone differs in area code')
+    if email:
+        reasons.append('same email name')
+    return NAME_WEIGHT * name + _id_score(phone, email), ', '.join(reasons)
+
+def _block_pairs(members):
+    """Pairs to compare within one block"""
+    if len(members) <= MAX_BLOCK_SIZE:
+        for i in range(len(members)):
+            for j in range(i + 1, len(members)):
+                yield members[i], members[j]
+        return
+    # Sorted neighbourhood: similar names (and, within a name, the same
+    # local phone number) end up next to each other
+    members = sorted(members, key=lambda key: (key.name, (key.phone or '')[-7:]))
+    for i in range(len(members)):
+        for j in range(i + 1, min(i + WINDOW_SIZE, len(members))):
+            yield members[i], members[j]
+
+def load_contact_keys(batch_size=SCAN_BATCH_SIZE):
+    """Every contact's dedup fields, as a list of ContactKey
+
+    Rows are fetched from the cursor `batch_size` at a time, but the keys
+    themselves are all kept: blocking needs the whole table in memory
+    (benchmarks/bench_dedup.py reports how much).
+    """
+    statement = db.select(
+        Contact.id, Contact.full_name, Contact.phone_normalized, Contact.email
+    ).execution_options(yield_per=batch_size)
+    return [ContactKey(*row) for row in db.session.execute(statement)]
+
+def find_duplicate_pairs(keys, threshold=DEFAULT_THRESHOLD):
+    """Yield (contact_id, duplicate_id, score, reasons) for likely duplicates
+
+    Contacts are grouped by blocking key (phone, email name, phonetic name)
+    and only pairs within a block are compared, so the work grows with the
+    block sizes rather than with the square of the number of contacts.
+    """
+    blocks = {}
+    for key in keys:
+        for block_key in key.blocking_keys():
+            blocks.setdefault(block_key, []).append(key)
+
+    seen = set()
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        for a, b in _block_pairs(members):
+            # Skip the string comparison when even identical names
+            # couldn't lift the pair over the threshold
+            if NAME_WEIGHT + _id_score(*_id_matches(a, b)) < threshold:
+                continue
+            pair = (a.id, b.id) if a.id < b.id else (b.id, a.id)
+            if pair in seen:
+                continue
+            seen.add(pair)
+            score, reasons = score_pair(a, b)
+            if score >= threshold:
+                yield pair[0], pair[1], round(score, 3), reasons
+
+def shared_email_pairs(connection):
+    """Yield (contact_id, duplicate_id, 1.0, reasons) for contacts that share an email
+
+    email_normalized is unique, so when migration 2 found several contacts
+    with one email only the oldest got it. Each of the others is paired
+    with that contact, whatever the threshold. `connection` is a session or
+    a Core connection.
+    """
+    table = Contact.__table__
+    rows = connection.execute(
+        db.select(table.c.id, table.c.email).where(table.c.email_normalized.is_(None))
+    ).all()
+    for contact_id, email in rows:
+        owner_id = connection.execute(
+            db.select(table.c.id).where(table.c.email_normalized == normalize_email(email))
+        ).scalar()
+        if owner_id is not None:
+            yield min(owner_id, contact_id), max(owner_id, contact_id), 1.0, 'same email'
+
+def scan_duplicates(threshold=DEFAULT_THRESHOLD, progress=None):
+    """Replace the pending review queue with a fresh scan; returns stats
+
+    Pairs that were already dismissed are not suggested again.
+    """
+    started = time.perf_counter()
+    keys = load_contact_keys()
+    if progress:
+        progress(len(keys))
+
+    reviewed = {
+        (row.contact_id, row.duplicate_id)
+        for row in db.session.execute(
+            db.select(DuplicateCandidate.contact_id, DuplicateCandidate.duplicate_id)
+            .where(DuplicateCandidate.status != DuplicateCandidate.PENDING)
+        )
+    }
+    pairs = {(a, b): (score, reasons) for a, b, score, reasons in find_duplicate_pairs(keys, threshold)}
+    pairs.update({(a, b): (score, reasons) for a, b, score, reasons in shared_email_pairs(db.session)})
+    now = datetime.utcnow()
+    candidates = [
+        {'contact_id': a, 'duplicate_id': b, 'score': score, 'reasons': reasons,
+         'status': DuplicateCandidate.PENDING, 'created_at': now}
+        for (a, b), (score, reasons) in pairs.items()
+        if (a, b) not in reviewed
+    ]
+
+    table = DuplicateCandidate.__table__
+    db.session.execute(table.delete().where(table.c.status == DuplicateCandidate.PENDING))
+    if candidates:
+        db.session.execute(table.insert(), candidates)
+    db.session.commit()
+
+    stats = {
+        'total': len(keys),
+        'candidates': len(candidates),
+        'seconds': round(time.perf_counter() - started, 1),
+        'errors': []
+    }
+    stats['summary'] = f"{stats['candidates']} possible duplicates among {stats['total']} contacts"
+    logger.info(f"Duplicate scan: {stats['summary']} in {stats['seconds']}s")
+    return stats
+
+# Fields copied from the merged-away contact when the kept one has none
+MERGE_FILL_FIELDS = ['address', 'company']
+
+def merge_contacts(keep, remove):
+    """Fold `remove` into `keep` and delete it; the caller commits
+
+    Empty fields of `keep` are filled from `remove`, notes are combined and
+    review entries involving `remove` are dropped.
+    """
+    for field in MERGE_FILL_FIELDS:
+        if not getattr(keep, field) and getattr(remove, field):
+            setattr(keep, field, getattr(remove, field))
+    if remove.notes and remove.notes != keep.notes:
+        keep.notes = f'{keep.notes}\n{remove.notes}' if keep.notes else remove.notes
+    keep.updated_at = datetime.utcnow()
+    # Flushing the delete also drops remove's review entries (models._on_contacts_deleted)
+    db.session.delete(remove)
+
+def resolve_candidate(candidate, keep_id=None, merge=True):
+    """Merge a reviewed pair (keeping `keep_id`, default the older contact) or dismiss it
+
+    Returns the kept contact, or None when dismissed; the caller commits.
+    Raises ValueError if `keep_id` is not one of the pair.
+    """
+    if not merge:
+        candidate.status = DuplicateCandidate.DISMISSED
+        return None
+    keep_id = candidate.contact_id if keep_id is None else keep_id
+    if keep_id == candidate.contact_id:
+        keep, remove = candidate.contact, candidate.duplicate
+    elif keep_id == candidate.duplicate_id:
+        keep, remove = candidate.duplicate, candidate.contact
+    else:
+        raise ValueError(f'Contact {keep_id} is not part of this pair.')
+    merge_contacts(keep, remove)
+    return keep
+
+dedup_cli = AppGroup('dedup', help='Find and review duplicate contacts.')
+
+@dedup_cli.command('scan')
+@click.option('--threshold', type=float, default=None, help='Minimum score to report (default: DEDUP_THRESHOLD).')
+def scan_command(threshold):
+    """Rebuild the duplicate review queue"""
+    from flask import current_app
+    stats = scan_duplicates(threshold if threshold is not None else current_app.config['DEDUP_THRESHOLD'])
+    click.echo(f"{stats['summary']} ({stats['seconds']}s)")
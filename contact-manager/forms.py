@@ -1,12 +1,69 @@
 import re
-from email_validator import validate_email, EmailNotValidError
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from itertools import repeat
+from flask import current_app, has_app_context
+from models import normalize_email, normalize_name, normalize_phone
+
+logger = logging.getLogger(__name__)
+
+# Distinct addresses / domains whose validation results are kept in memory
+EMAIL_CACHE_SIZE = 65536
+DOMAIN_CACHE_SIZE = 4096
+
+# Smallest slice of rows sent to a validation worker process
+MIN_ROWS_PER_TASK = 250
+
+FORM_FIELDS = ['full_name', 'phone_number', 'email', 'address', 'company', 'notes']
+
+@lru_cache(maxsize=EMAIL_CACHE_SIZE)
+def _check_email_syntax(email):
+    """(error, ascii_domain, domain) for an address, without any DNS lookups"""
+    # Imported on first use: email_validator is slow to import and only
+    # needed when contact data is actually validated
+    from email_validator import validate_email, EmailNotValidError
+    try:
+        result = validate_email(email, check_deliverability=False)
+    except EmailNotValidError as e:
+        return str(e), None, None
+    return None, result.ascii_domain, result.domain
+
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def _check_domain(ascii_domain, domain):
+    """Error message if the domain cannot receive email (DNS lookup), else None"""
+    from email_validator import EmailNotValidError
+    from email_validator.deliverability import validate_email_deliverability
+    try:
+        validate_email_deliverability(ascii_domain, domain)
+    except EmailNotValidError as e:
+        return str(e)
+    return None
+
+def email_error(email, check_deliverability=True):
+    """Validate an email address, memoizing syntax per address and DNS per domain"""
+    error, ascii_domain, domain = _check_email_syntax(email)
+    if error is None and check_deliverability:
+        error = _check_domain(ascii_domain, domain)
+    return error
+
+def _default_check_deliverability():
+    if has_app_context():
+        return current_app.config.get('EMAIL_CHECK_DELIVERABILITY', True)
+    return True
 
 class ContactForm:
     """Form validation for contact data"""
     
-    def __init__(self, data):
+    def __init__(self, data, check_deliverability=None):
         self.data = data
         self.errors = {}
+        if check_deliverability is None:
+            check_deliverability = _default_check_deliverability()
+        self.check_deliverability = check_deliverability
     
     def validate(self):
         """Validate all contact fields"""
@@ -45,11 +102,9 @@ class ContactForm:
         if not email:
             self.errors['email'] = 'Email is required.'
         else:
-            try:
-                # Validate email format
-                validate_email(email)
-            except EmailNotValidError as e:
-                self.errors['email'] = f'Invalid email format: {str(e)}'
+            error = email_error(email, self.check_deliverability)
+            if error:
+                self.errors['email'] = f'Invalid email format: {error}'
     
     def get_cleaned_data(self):
         """Return cleaned and validated data"""
@@ -57,7 +112,74 @@ class ContactForm:
             'full_name': self.data.get('full_name', '').strip(),
             'phone_number': self.data.get('phone_number', '').strip(),
             'email': self.data.get('email', '').strip().lower(),
+            'email_normalized': normalize_email(self.data.get('email', '')),
+            'name_normalized': normalize_name(self.data.get('full_name', '')),
+            'phone_normalized': normalize_phone(self.data.get('phone_number', '')),
             'address': self.data.get('address', '').strip() or None,
             'company': self.data.get('company', '').strip() or None,
             'notes': self.data.get('notes', '').strip() or None
         }
+
+def validate_contact_rows(rows, check_deliverability=True):
+    """Run ContactForm's rules over many rows; returns one errors dict per row ({} if valid)"""
+    results = []
+    for row in rows:
+        form = ContactForm({field: row.get(field) or '' for field in FORM_FIELDS}, check_deliverability)
+        form.validate()
+        results.append(form.errors)
+    return results
+
+# Worker pools by size, started on first use and reused across imports.
+# Requests and job threads share them, so creation is serialized.
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _get_pool(workers):
+    with _pools_lock:
+        if workers not in _pools:
+            # spawn, not fork: the app process has live threads and DB connections
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pools[workers]
+
+def _discard_pool(workers, pool):
+    """Forget a broken pool, unless another thread has already replaced it"""
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+    pool.shutdown(wait=False)
+
+class BulkValidator:
+    """Validates batches of CSV rows with the contact form rules
+    
+    Email results are cached per address and DNS results per domain, so a
+    large import resolves each domain once. With `workers` > 0, batches of
+    at least 2 * MIN_ROWS_PER_TASK rows are split across a process pool.
+    """
+    
+    def __init__(self, check_deliverability=True, workers=0):
+        self.check_deliverability = check_deliverability
+        self.workers = workers
+    
+    @classmethod
+    def for_import(cls, config):
+        """The validator configured for CSV imports, or None if IMPORT_VALIDATE is off"""
+        if not config['IMPORT_VALIDATE']:
+            return None
+        return cls(config['EMAIL_CHECK_DELIVERABILITY'], config['IMPORT_VALIDATION_WORKERS'])
+    
+    def validate(self, rows):
+        """Return one errors dict per row, in order"""
+        if not self.workers or len(rows) < 2 * MIN_ROWS_PER_TASK:
+            return validate_contact_rows(rows, self.check_deliverability)
+        
+        size = max(MIN_ROWS_PER_TASK, -(-len(rows) // self.workers))
+        slices = [rows[i:i + size] for i in range(0, len(rows), size)]
+        pool = _get_pool(self.workers)
+        try:
+            results = pool.map(validate_contact_rows, slices, repeat(self.check_deliverability))
+            return [errors for part in results for errors in part]
+        except BrokenProcessPool as e:
+            # A worker died; start a fresh pool next time and finish this batch here
+            _discard_pool(self.workers, pool)
+            logger.warning(f'Validation worker pool failed, validating in-process: {str(e)}')
+            return validate_contact_rows(rows, self.check_deliverability)
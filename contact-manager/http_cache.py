@@ -0,0 +1,175 @@
+import functools
+import gzip
+import hashlib
+import logging
+import os
+import zlib
+from flask import current_app, get_flashed_messages, request, session
+from models import db, Contact, ContactTombstone
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Responses of these types are compressed; files and images are left alone
+COMPRESSIBLE_MIMETYPES = {'text/html', 'text/csv', 'application/json', 'text/plain'}
+
+def contacts_watermark():
+    """(latest updated_at, latest tombstone id); changes on every insert, update and delete
+
+    Both are single lookups at the end of an index: updated_at moves on
+    inserts and updates, and every delete leaves a tombstone (see changes.py).
+    """
+    return db.session.execute(db.select(
+        db.select(db.func.max(Contact.updated_at)).scalar_subquery(),
+        db.select(db.func.max(ContactTombstone.id)).scalar_subquery()
+    )).one()
+
+def contact_watermark(contact_id):
+    """updated_at of one contact (None if it doesn't exist)"""
+    return db.session.execute(db.select(Contact.updated_at).where(Contact.id == contact_id)).scalar()
+
+class HttpCache:
+    """Conditional GETs (ETag / Last-Modified -> 304) and response compression
+
+    Views opt in with @conditional(watermark); compression applies to every
+    HTML, CSV and JSON response when the client accepts it.
+    """
+
+    def __init__(self, app=None):
+        self.cache_control = 'private, no-cache'
+        self.compress_level = 6
+        self.compress_min_size = 1024
+        self._version = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['http_cache'] = self
+        self.cache_control = app.config['HTTP_CACHE_CONTROL']
+        self.compress_level = app.config['COMPRESS_LEVEL']
+        self.compress_min_size = app.config['COMPRESS_MIN_SIZE']
+        if app.config['COMPRESS_RESPONSES']:
+            app.after_request(self._compress)
+
+    def version(self):
+        """Changes when templates or static files are deployed, so cached pages don't outlive them"""
+        if self._version is None:
+            latest = 0
+            for folder in (current_app.template_folder, current_app.static_folder):
+                folder = os.path.join(current_app.root_path, folder)
+                for root, _, files in os.walk(folder):
+                    for name in files:
+                        latest = max(latest, os.stat(os.path.join(root, name)).st_mtime_ns)
+            self._version = str(latest)
+        return self._version
+
+    def etag(self, watermark):
+        """Weak ETag for the current URL at a data watermark
+
+        Weak, because the same content may be sent gzip-encoded or not.
+        """
+        digest = hashlib.blake2b(repr((self.version(), request.full_path, watermark)).encode(), digest_size=12)
+        return digest.hexdigest()
+
+    def _compress(self, response):
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers
+        ):
+            return response
+        response.vary.add('Accept-Encoding')
+
+        offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+        encoding = request.accept_encodings.best_match(offered)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.compress_min_size:
+                return response
+            if encoding == 'br':
+                response.set_data(brotli.compress(data, quality=min(self.compress_level, 11)))
+            else:
+                response.set_data(gzip.compress(data, self.compress_level))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _compress_stream(self, chunks, encoding):
+        """Compress a streamed body chunk by chunk, keeping it streamed"""
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=min(self.compress_level, 11))
+            compress, finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            compress, finish = compressor.compress, compressor.flush
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                data = compress(chunk)
+                if data:
+                    yield data
+            yield finish()
+        finally:
+            # Run the wrapped iterable's cleanup (e.g. stream_with_context teardown)
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+http_cache = HttpCache()
+
+def conditional(watermark, last_modified=False):
+    """Answer conditional GETs for a view whose output only depends on `watermark`
+
+    `watermark(**view_args)` must be cheap and change whenever the view's
+    output would; None means "don't cache" (e.g. the row doesn't exist, so
+    the view can 404). With last_modified=True the watermark must be a
+    datetime and is also sent as Last-Modified.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            # A page with pending flash messages renders (and consumes) them
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(**kwargs)
+            try:
+                mark = watermark(**kwargs)
+            except Exception as e:
+                # Let the view report database errors its own way
+                db.session.rollback()
+                logger.warning(f'Skipping conditional GET for {request.path}: {str(e)}')
+                mark = None
+            if mark is None:
+                return view(**kwargs)
+
+            etag = http_cache.etag(mark)
+            if request.if_none_match:
+                modified = not request.if_none_match.contains_weak(etag)
+            elif last_modified and request.if_modified_since:
+                modified = mark.replace(microsecond=0) > request.if_modified_since.replace(tzinfo=None)
+            else:
+                modified = True
+
+            if modified:
+                response = current_app.make_response(view(**kwargs))
+                # Error pages (which flash a message) must not be revalidated as current
+                if response.status_code != 200 or get_flashed_messages():
+                    return response
+            else:
+                response = current_app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = mark
+            response.headers['Cache-Control'] = http_cache.cache_control
+            return response
+        return wrapper
+    return decorator
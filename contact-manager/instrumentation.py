@@ -0,0 +1,225 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from models import db
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the queries-per-request histogram buckets
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+# Slow statements are logged truncated to this many characters
+MAX_LOGGED_STATEMENT = 500
+# Functions listed in the log summary of a profiled request
+PROFILE_TOP_FUNCTIONS = 25
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    pairs = list(labels)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, zip(self.labelnames, key), value
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, as Prometheus expects"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f'{self.name}_bucket', labels + [('le', _format_number(bound))], cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, cumulative
+
+class Metrics:
+    """Per-route latency, SQL query counts/time and a slow-query log
+
+    Metrics live in process memory, so each worker process exposes its own
+    numbers at /metrics; scrape every worker (or run a single one) to see
+    the whole picture.
+    """
+
+    def __init__(self, app=None):
+        self.request_latency = Histogram(
+            'http_request_duration_seconds', 'Request latency by route.',
+            ('method', 'endpoint', 'status')
+        )
+        self.request_queries = Histogram(
+            'http_request_db_queries', 'SQL statements executed per request.',
+            ('endpoint',), buckets=QUERY_COUNT_BUCKETS
+        )
+        self.query_seconds = Counter(
+            'db_query_duration_seconds_total', 'Time spent executing SQL, by route.', ('endpoint',)
+        )
+        self.slow_queries = Counter(
+            'db_slow_queries_total', 'SQL statements slower than SLOW_QUERY_MS, by route.', ('endpoint',)
+        )
+        self.slow_query_seconds = 0.2
+        self.profile_mode = 'off'
+        self.profile_dir = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['metrics'] = self
+        if not app.config['METRICS_ENABLED']:
+            return
+        self.slow_query_seconds = app.config['SLOW_QUERY_MS'] / 1000
+        self.profile_mode = app.config['PROFILE_REQUESTS']
+        self.profile_dir = app.config['PROFILE_DIR']
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.render)
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(db.engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(db.engine, 'handle_error', self._handle_error)
+
+    def _endpoint(self):
+        # Unmatched URLs share one label so 404 scans can't blow up cardinality
+        return request.endpoint or 'unmatched'
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append((context, time.perf_counter()))
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        _, started = conn.info['query_started'].pop()
+        elapsed = time.perf_counter() - started
+        endpoint = None
+        if has_request_context():
+            endpoint = self._endpoint()
+            g.query_count = g.get('query_count', 0) + 1
+            g.query_time = g.get('query_time', 0.0) + elapsed
+            self.query_seconds.inc(elapsed, endpoint=endpoint)
+        if elapsed >= self.slow_query_seconds:
+            self.slow_queries.inc(endpoint=endpoint or 'background')
+            statement = ' '.join(statement.split())[:MAX_LOGGED_STATEMENT]
+            logger.warning(f'Slow query ({elapsed * 1000:.1f}ms) in {endpoint or "background"}: {statement}')
+
+    def _handle_error(self, context):
+        # A failed statement never reaches after_cursor_execute; drop its start
+        # time so the pooled connection's stack doesn't grow with every error.
+        # Errors raised before the statement ran (or while fetching) pushed nothing.
+        if context.connection is None or context.execution_context is None:
+            return
+        started = context.connection.info.get('query_started')
+        if started and started[-1][0] is context.execution_context:
+            started.pop()
+
+    def _should_profile(self):
+        if self.profile_mode == 'all':
+            return True
+        return self.profile_mode == 'header' and request.headers.get('X-Profile') == '1'
+
+    def _before_request(self):
+        g.request_started = time.perf_counter()
+        if self._should_profile():
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    def _after_request(self, response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            response.headers['X-Profile-File'] = self._save_profile(profiler)
+
+        elapsed = time.perf_counter() - started
+        query_count = g.get('query_count', 0)
+        query_time = g.get('query_time', 0.0)
+        endpoint = self._endpoint()
+        self.request_latency.observe(elapsed, method=request.method, endpoint=endpoint, status=str(response.status_code))
+        self.request_queries.observe(query_count, endpoint=endpoint)
+        response.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, db;dur={query_time * 1000:.1f};desc="{query_count} queries"'
+        )
+        return response
+
+    def _save_profile(self, profiler):
+        """Dump a request profile to PROFILE_DIR and log its top functions; returns the file name"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        filename = f'{datetime.now().strftime("%Y%m%d_%H%M%S_%f")}_{self._endpoint()}.prof'
+        profiler.dump_stats(os.path.join(self.profile_dir, filename))
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        current_app.logger.info(f'Profile of {request.method} {request.path} saved to {filename}\n{summary.getvalue()}')
+        return filename
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in (self.request_latency, self.request_queries, self.query_seconds, self.slow_queries):
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_number(value)}')
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+metrics = Metrics()
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from models import db, Job
+
+logger = logging.getLogger(__name__)
+
+# Per-row error messages kept on the job row; the full count is always kept
+MAX_STORED_ERRORS = 100
+
+class ProgressReporter:
+    """Progress callback handed to long-running work, throttled to limit writes"""
+    
+    def __init__(self, job_id, interval):
+        self.job_id = job_id
+        self.interval = interval
+        self._last_write = 0.0
+    
+    def __call__(self, rows_processed, stats=None, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_write < self.interval:
+            return
+        self._last_write = now
+        
+        values = {'rows_processed': rows_processed}
+        if stats is not None:
+            values['stats'] = _encode_stats(stats)
+        statement = db.update(Job).where(Job.id == self.job_id).values(**values)
+        if db.engine.dialect.name == 'sqlite':
+            # SQLite keeps the job's open read cursor across a commit, while a
+            # second connection couldn't commit under that read's lock
+            # (rollback-journal mode)
+            db.session.execute(statement)
+            db.session.commit()
+        else:
+            # Committing the session would close a server-side cursor the
+            # job is still reading (e.g. an export's yield_per result)
+            with db.engine.begin() as conn:
+                conn.execute(statement)
+
+def _encode_stats(stats):
+    """Serialize a stats dict, truncating the per-row error list"""
+    stats = dict(stats)
+    errors = stats.get('errors') or []
+    stats['error_count'] = len(errors)
+    stats['errors'] = errors[:MAX_STORED_ERRORS]
+    return json.dumps(stats)
+
+class JobManager:
+    """Runs imports and exports on a thread pool, tracking them in the jobs table"""
+    
+    def __init__(self, app=None):
+        self.app = None
+        self.executor = None
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        self.app = app
+        workers = app.config['JOB_WORKERS']
+        # JOB_WORKERS = 0 runs jobs inline, e.g. on serverless hosts that
+        # freeze the process once the response is sent
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job') if workers else None
+        app.extensions['jobs'] = self
+    
+    def path_for(self, job_id, suffix):
+        """Return the working file path for a job, creating JOB_DIR on first use"""
+        os.makedirs(self.app.config['JOB_DIR'], exist_ok=True)
+        return os.path.join(self.app.config['JOB_DIR'], f'{job_id}{suffix}')
+    
+    def cleanup(self):
+        """Fail jobs left behind by a crash or restart and delete expired job files
+        
+        Runs before the first request and whenever a job is created. Only
+        jobs older than JOB_STALE_HOURS are failed, since with several worker
+        processes a newer one may still be running elsewhere.
+        """
+        try:
+            self._cleanup()
+        except Exception as e:
+            # Housekeeping must not keep the app from serving
+            db.session.rollback()
+            logger.warning(f'Job cleanup skipped: {str(e)}')
+    
+    def _cleanup(self):
+        now = datetime.utcnow()
+        stale = now - timedelta(hours=self.app.config['JOB_STALE_HOURS'])
+        result = db.session.execute(
+            db.update(Job)
+            .where(Job.status.in_([Job.QUEUED, Job.RUNNING]), Job.created_at < stale)
+            .values(status=Job.FAILED, error='Interrupted: the server stopped before the job finished.', finished_at=now)
+        )
+        if result.rowcount:
+            logger.warning(f'Marked {result.rowcount} interrupted jobs as failed')
+        
+        job_dir = self.app.config['JOB_DIR']
+        expired = time.time() - self.app.config['JOB_RETENTION_HOURS'] * 3600
+        removed = []
+        if os.path.isdir(job_dir):
+            for entry in os.scandir(job_dir):
+                if entry.is_file() and entry.stat().st_mtime < expired:
+                    os.remove(entry.path)
+                    removed.append(entry.path)
+        if removed:
+            db.session.execute(db.update(Job).where(Job.result_path.in_(removed)).values(result_path=None))
+            logger.info(f'Deleted {len(removed)} expired job files')
+        db.session.commit()
+    
+    def create(self, kind, filename=None):
+        """Record a new queued job"""
+        self.cleanup()
+        job = Job(id=uuid.uuid4().hex, kind=kind, filename=filename, status=Job.QUEUED)
+        db.session.add(job)
+        db.session.commit()
+        return job
+    
+    def submit(self, job, fn, *args):
+        """Run fn(*args, progress=reporter) for `job` in the background
+        
+        fn returns (rows_processed, stats, result_path); stats and result_path may be None.
+        """
+        if self.executor is None:
+            self._run(job.id, fn, args)
+        else:
+            self.executor.submit(self._run, job.id, fn, args)
+        return job
+    
+    def _run(self, job_id, fn, args):
+        with self.app.app_context():
+            job = db.session.get(Job, job_id)
+            job.status = Job.RUNNING
+            job.started_at = datetime.utcnow()
+            db.session.commit()
+            
+            reporter = ProgressReporter(job_id, self.app.config['JOB_PROGRESS_INTERVAL'])
+            try:
+                rows, stats, result_path = fn(*args, progress=reporter)
+                job = db.session.get(Job, job_id)
+                job.rows_processed = rows
+                job.stats = _encode_stats(stats) if stats is not None else None
+                job.result_path = result_path
+                job.status = Job.FINISHED
+                logger.info(f'Job {job.kind} {job_id} finished: {rows} rows')
+            except Exception as e:
+                db.session.rollback()
+                job = db.session.get(Job, job_id)
+                job.status = Job.FAILED
+                job.error = str(e)
+                logger.error(f'Job {job.kind} {job_id} failed: {str(e)}')
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+job_manager = JobManager()
+
+def run_import_job(path, chunk_size, validator=None, progress=None):
+    """Import a saved CSV upload, removing the file afterwards"""
+    from utils import import_contacts_from_csv
+    try:
+        with open(path, 'rb') as file_stream:
+            stats = import_contacts_from_csv(file_stream, chunk_size=chunk_size, progress=progress, validator=validator)
+    finally:
+        os.remove(path)
+    return stats['total'], stats, None
+
+def run_export_job(path, batch_size, progress=None):
+    """Write all contacts to a CSV file for later download"""
+    from utils import iter_contacts_csv
+    exported = [0]
+    
+    def track(rows):
+        exported[0] = rows
+        if progress:
+            progress(rows)
+    
+    with open(path, 'w', encoding='utf-8', newline='') as output:
+        for chunk in iter_contacts_csv(batch_size=batch_size, progress=track):
+            output.write(chunk)
+    return exported[0], None, path
+
+def run_dedup_job(threshold, progress=None):
+    """Rebuild the duplicate review queue"""
+    from dedup import scan_duplicates
+    stats = scan_duplicates(threshold, progress=progress)
+    return stats['total'], stats, None
@@ -0,0 +1,209 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+# Records the writer thread drains from the queue and writes per flush
+MAX_BATCH_SIZE = 500
+# Distinct messages tracked by RepeatFilter before its table is reset
+MAX_TRACKED_MESSAGES = 1000
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+
+class LazyRotatingFileHandler(RotatingFileHandler):
+    """Rotating log file whose directory and file are created on the first record"""
+
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, delay=True, **kwargs)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+    def emit_batch(self, records):
+        """Write several records with a single flush, rotating between them as needed"""
+        self.acquire()
+        try:
+            for record in records:
+                try:
+                    if self.shouldRollover(record):
+                        self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                    self.stream.write(self.format(record) + self.terminator)
+                except Exception:
+                    self.handleError(record)
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            self.release()
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class RepeatFilter(logging.Filter):
+    """Let through at most `limit` records with the same message template per `period` seconds
+
+    Warnings and errors are grouped by the line that logged them, so a storm
+    of f-string errors (`logger.error(f'... {str(e)}')`) from one handler is
+    limited too. Lower levels are grouped by unformatted message, so only
+    calls passing variable parts as arguments (`logger.info('Row %d', n)`)
+    are, and per-contact audit lines are never dropped. The first record
+    after a quiet period reports how many were dropped.
+    """
+
+    def __init__(self, limit, period):
+        super().__init__()
+        self.limit = limit
+        self.period = period
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            key = (record.name, record.levelno, record.pathname, record.lineno)
+        else:
+            key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._seen.get(key)
+            if window is None or now - window[0] >= self.period:
+                suppressed = window[2] if window else 0
+                if len(self._seen) >= MAX_TRACKED_MESSAGES:
+                    self._seen.clear()
+                self._seen[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f'{record.msg} [{suppressed} similar messages suppressed]'
+                return True
+            window[1] += 1
+            if window[1] <= self.limit:
+                return True
+            window[2] += 1
+            return False
+
+class BatchingQueueListener:
+    """Writer thread that drains whatever is queued and hands it to each handler in one batch
+
+    Handlers with an emit_batch() method write the batch with a single
+    flush; others get the records one at a time as usual. Works like
+    logging.handlers.QueueListener (start/stop), on a thread of its own.
+    """
+
+    _STOP = object()
+
+    def __init__(self, log_queue, *handlers, respect_handler_level=False):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.respect_handler_level = respect_handler_level
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write out everything queued so far, then end the thread"""
+        if self._thread is not None:
+            self.queue.put(self._STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < MAX_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if self._STOP in batch:
+                batch = batch[:batch.index(self._STOP)]
+                stopping = True
+            self.handle_batch(batch)
+
+    def handle_batch(self, records):
+        for handler in self.handlers:
+            accepted = [
+                record for record in records
+                if (not self.respect_handler_level or record.levelno >= handler.level) and handler.filter(record)
+            ]
+            if not accepted:
+                continue
+            if hasattr(handler, 'emit_batch'):
+                handler.emit_batch(accepted)
+            else:
+                for record in accepted:
+                    handler.handle(record)
+
+# The running pipeline; replaced if configure_logging() is called again
+_listener = None
+_attached = []  # (logger, handler) pairs feeding the current queue
+
+def _stop_listener():
+    """Write out everything still queued and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(_stop_listener)
+
+def configure_logging(app):
+    """Send app and module logs through a queue to a background writer thread
+
+    Request threads only enqueue records; a single thread writes them to the
+    rotating log file in batches. app.logger records at LOG_LEVEL go to the
+    file (and the console, as before); other modules' warnings and errors go
+    to the file instead of stderr. Repeated messages are rate-limited.
+    """
+    global _listener
+    _stop_listener()
+    for logger, handler in _attached:
+        logger.removeHandler(handler)
+    _attached.clear()
+
+    file_handler = LazyRotatingFileHandler(
+        app.config['LOG_FILE'],
+        maxBytes=10240000,  # 10MB
+        backupCount=10
+    )
+    if app.config['LOG_FORMAT'] == 'json':
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    file_handler.setLevel(app.config['LOG_LEVEL'])
+
+    log_queue = queue.SimpleQueue()
+    repeat_filter = RepeatFilter(app.config['LOG_REPEAT_LIMIT'], app.config['LOG_REPEAT_PERIOD'])
+    for logger, level in ((app.logger, app.config['LOG_LEVEL']), (logging.getLogger(), logging.WARNING)):
+        handler = QueueHandler(log_queue)
+        handler.setLevel(level)
+        handler.addFilter(repeat_filter)
+        logger.addHandler(handler)
+        _attached.append((logger, handler))
+    app.logger.setLevel(app.config['LOG_LEVEL'])
+    # app.logger has its own queue handler; don't enqueue its records twice via root
+    app.logger.propagate = False
+
+    _listener = BatchingQueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
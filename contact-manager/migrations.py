@@ -0,0 +1,349 @@
+import logging
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text, inspect, text
+from sqlalchemy.exc import DBAPIError
+from models import db, Contact, ContactTombstone, DuplicateCandidate, normalize_email, normalize_name, normalize_phone
+from search_index import install_search_index, drop_search_index
+from dedup import shared_email_pairs
+
+logger = logging.getLogger(__name__)
+
+# One row per applied migration; the highest version is the schema version
+schema_version = Table(
+    'schema_version',
+    MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+# Rows updated per statement while backfilling normalized columns
+BACKFILL_BATCH_SIZE = 5000
+
+# pg_advisory_xact_lock key held while migrating ('contacts' in ASCII)
+POSTGRES_LOCK_KEY = 0x636f6e7461637473
+# How long a SQLite process waits for another one's migrations to finish
+SQLITE_LOCK_TIMEOUT_MS = 10 * 60 * 1000
+
+class Migration:
+    """A numbered schema change
+
+    `upgrade(conn)` runs in the transaction that records the new version,
+    under the migration lock. It must also be safe on a database that
+    already has the change (one created by db.create_all).
+    """
+
+    def __init__(self, version, name, upgrade):
+        self.version = version
+        self.name = name
+        self.upgrade = upgrade
+
+# The tables as migration 1 shipped them; later migrations alter these, so
+# the current models must not be used here
+_base_metadata = MetaData()
+_base_tables = [
+    Table(
+        'contacts',
+        _base_metadata,
+        Column('id', Integer, primary_key=True),
+        Column('full_name', String(100), nullable=False, index=True),
+        Column('phone_number', String(20), nullable=False),
+        Column('email', String(120), nullable=False, index=True),
+        Column('address', Text, nullable=True),
+        Column('company', String(100), nullable=True),
+        Column('notes', Text, nullable=True),
+        Column('created_at', DateTime, nullable=False),
+        Column('updated_at', DateTime, nullable=False)
+    ),
+    Table(
+        'jobs',
+        _base_metadata,
+        Column('id', String(32), primary_key=True),
+        Column('kind', String(20), nullable=False),
+        Column('status', String(20), nullable=False),
+        Column('filename', String(255), nullable=True),
+        Column('rows_processed', Integer, nullable=False),
+        Column('stats', Text, nullable=True),
+        Column('error', Text, nullable=True),
+        Column('result_path', String(500), nullable=True),
+        Column('created_at', DateTime, nullable=False),
+        Column('started_at', DateTime, nullable=True),
+        Column('finished_at', DateTime, nullable=True)
+    )
+]
+
+def _create_base_tables(conn):
+    """Contacts and jobs tables (a no-op on databases created by db.create_all)"""
+    for base_table in _base_tables:
+        base_table.create(conn, checkfirst=True)
+
+def _add_normalized_columns(conn):
+    """Add and backfill email_normalized/phone_normalized on older databases
+
+    Only the lowest-id contact of each group sharing a normalized email gets
+    the value; later duplicates keep NULL (allowed by the unique index) and
+    are reported so they can be merged.
+    """
+    columns = {column['name'] for column in inspect(conn).get_columns('contacts')}
+    if {'email_normalized', 'phone_normalized'} <= columns:
+        return
+
+    table = Contact.__table__
+    for name in ('email_normalized', 'phone_normalized'):
+        if name not in columns:
+            column_type = table.c[name].type.compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f'ALTER TABLE contacts ADD COLUMN {name} {column_type}')
+
+    seen = set()
+    duplicates = 0
+    batch = []
+    # Keep updated_at as it was: its onupdate default would restamp every row
+    update = (
+        table.update()
+        .where(table.c.id == db.bindparam('contact_id'))
+        .values(updated_at=table.c.updated_at)
+    )
+    rows = conn.execute(db.select(table.c.id, table.c.email, table.c.phone_number).order_by(table.c.id)).all()
+    for contact_id, email, phone in rows:
+        email_normalized = normalize_email(email)
+        if email_normalized in seen:
+            duplicates += 1
+            email_normalized = None
+        elif email_normalized is not None:
+            seen.add(email_normalized)
+        batch.append({
+            'contact_id': contact_id,
+            'email_normalized': email_normalized,
+            'phone_normalized': normalize_phone(phone)
+        })
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            conn.execute(update, batch)
+            batch = []
+    if batch:
+        conn.execute(update, batch)
+
+    if duplicates:
+        logger.warning(f'{duplicates} contacts share an email with an older contact; their email_normalized was left empty')
+
+def _index_normalized_columns(conn):
+    """Unique index on email_normalized, plain index on phone_normalized"""
+    for index in Contact.__table__.indexes:
+        if {column.name for column in index.columns} & {'email_normalized', 'phone_normalized'}:
+            index.create(conn, checkfirst=True)
+
+def _create_duplicate_candidates(conn):
+    """Review queue for the duplicate finder (see dedup.py)"""
+    DuplicateCandidate.__table__.create(conn, checkfirst=True)
+
+def _index_updated_at(conn):
+    """Index contacts.updated_at so the latest change is an index lookup"""
+    for index in Contact.__table__.indexes:
+        if [column.name for column in index.columns] == ['updated_at']:
+            index.create(conn, checkfirst=True)
+
+def _add_name_normalized(conn):
+    """Add, backfill and index name_normalized for typeahead prefix lookups"""
+    table = Contact.__table__
+    columns = {column['name'] for column in inspect(conn).get_columns('contacts')}
+    if 'name_normalized' not in columns:
+        column_type = table.c.name_normalized.type.compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f'ALTER TABLE contacts ADD COLUMN name_normalized {column_type}')
+
+    batch = []
+    update = (
+        table.update()
+        .where(table.c.id == db.bindparam('contact_id'))
+        .values(updated_at=table.c.updated_at)
+    )
+    rows = conn.execute(
+        db.select(table.c.id, table.c.full_name).where(table.c.name_normalized.is_(None)).order_by(table.c.id)
+    ).all()
+    for contact_id, full_name in rows:
+        batch.append({'contact_id': contact_id, 'name_normalized': normalize_name(full_name)})
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            conn.execute(update, batch)
+            batch = []
+    if batch:
+        conn.execute(update, batch)
+
+    for index in table.indexes:
+        if [column.name for column in index.columns] == ['name_normalized']:
+            index.create(conn, checkfirst=True)
+
+def _create_contact_tombstones(conn):
+    """Deleted-contact markers for the change feed (see changes.py)"""
+    ContactTombstone.__table__.create(conn, checkfirst=True)
+
+def _drop_orphaned_duplicate_candidates(conn):
+    """Remove review entries left behind by contacts deleted before deletes cleaned them up"""
+    candidates = DuplicateCandidate.__table__
+    contact_ids = db.select(Contact.__table__.c.id)
+    result = conn.execute(candidates.delete().where(db.or_(
+        candidates.c.contact_id.not_in(contact_ids),
+        candidates.c.duplicate_id.not_in(contact_ids)
+    )))
+    if result.rowcount:
+        logger.info(f'Removed {result.rowcount} duplicate candidates of deleted contacts')
+
+def _review_shared_emails(conn):
+    """Queue contacts left without email_normalized by migration 2 for duplicate review
+
+    If the older contact holding the email has since been deleted, the
+    first remaining one takes the email over instead.
+    """
+    contacts = Contact.__table__
+    candidates = DuplicateCandidate.__table__
+    rows = conn.execute(
+        db.select(contacts.c.id, contacts.c.email)
+        .where(contacts.c.email_normalized.is_(None))
+        .order_by(contacts.c.id)
+    ).all()
+    for contact_id, email in rows:
+        normalized = normalize_email(email)
+        taken = conn.execute(db.select(contacts.c.id).where(contacts.c.email_normalized == normalized)).scalar()
+        if taken is None:
+            conn.execute(
+                contacts.update()
+                .where(contacts.c.id == contact_id)
+                .values(email_normalized=normalized, updated_at=contacts.c.updated_at)
+            )
+
+    now = datetime.utcnow()
+    queued = 0
+    for contact_id, duplicate_id, score, reasons in list(shared_email_pairs(conn)):
+        exists = conn.execute(db.select(candidates.c.id).where(
+            candidates.c.contact_id == contact_id, candidates.c.duplicate_id == duplicate_id
+        )).scalar()
+        if exists is None:
+            conn.execute(candidates.insert().values(
+                contact_id=contact_id, duplicate_id=duplicate_id, score=score, reasons=reasons,
+                status=DuplicateCandidate.PENDING, created_at=now
+            ))
+            queued += 1
+    if queued:
+        logger.info(f'Queued {queued} contacts sharing an email for duplicate review')
+
+def _drop_email_index(conn):
+    """contacts.email is never looked up directly; the unique email_normalized index replaced it"""
+    if 'ix_contacts_email' in {index['name'] for index in inspect(conn).get_indexes('contacts')}:
+        # A detached table, so the dropped index isn't added to Contact's metadata
+        contacts = Table('contacts', MetaData(), Column('email', String(120)))
+        Index('ix_contacts_email', contacts.c.email).drop(conn)
+
+# Append new migrations here; never renumber or edit ones that have shipped
+MIGRATIONS = [
+    Migration(1, 'Create contacts and jobs tables', _create_base_tables),
+    Migration(2, 'Add normalized email/phone columns', _add_normalized_columns),
+    Migration(3, 'Index normalized email/phone columns', _index_normalized_columns),
+    Migration(4, 'Build full-text search index', install_search_index),
+    Migration(5, 'Create duplicate_candidates table', _create_duplicate_candidates),
+    Migration(6, 'Index contacts.updated_at', _index_updated_at),
+    Migration(7, 'Add and index normalized name column', _add_name_normalized),
+    Migration(8, 'Create contact_tombstones table', _create_contact_tombstones),
+    Migration(9, 'Drop duplicate candidates of deleted contacts', _drop_orphaned_duplicate_candidates),
+    Migration(10, 'Queue contacts sharing an email for duplicate review', _review_shared_emails),
+    Migration(11, 'Drop the plain index on contacts.email', _drop_email_index),
+]
+
+def latest_version():
+    return MIGRATIONS[-1].version
+
+def current_version(engine):
+    """Schema version recorded in the database (0 if never migrated)"""
+    with engine.connect() as conn:
+        try:
+            version = conn.execute(db.select(db.func.max(schema_version.c.version))).scalar()
+        except DBAPIError:
+            # No schema_version table yet
+            return 0
+    return version or 0
+
+def _lock(conn):
+    """Begin a transaction that only one process at a time can hold
+
+    SQLite takes its write lock up front (BEGIN IMMEDIATE); PostgreSQL takes
+    an advisory lock released at commit. Either way a second worker starting
+    up waits here instead of running the same DDL concurrently.
+    """
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        busy_timeout = conn.exec_driver_sql('PRAGMA busy_timeout').scalar()
+        conn.exec_driver_sql(f'PRAGMA busy_timeout = {SQLITE_LOCK_TIMEOUT_MS}')
+        try:
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+        finally:
+            conn.exec_driver_sql(f'PRAGMA busy_timeout = {busy_timeout}')
+    elif dialect == 'postgresql':
+        conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': POSTGRES_LOCK_KEY})
+
+def upgrade(engine, target=None):
+    """Apply pending migrations up to `target` (default: latest); returns those applied
+
+    Each migration is committed together with its schema_version row, under
+    the migration lock, so concurrent workers apply it exactly once.
+    """
+    target = latest_version() if target is None else target
+
+    applied = []
+    with engine.connect() as conn:
+        while True:
+            _lock(conn)
+            schema_version.create(conn, checkfirst=True)
+            # Read under the lock: another process may have migrated while we waited
+            version = conn.execute(db.select(db.func.max(schema_version.c.version))).scalar() or 0
+            pending = [migration for migration in MIGRATIONS if version < migration.version <= target]
+            if not pending:
+                conn.rollback()
+                return applied
+            migration = pending[0]
+            logger.info(f'Applying migration {migration.version}: {migration.name}')
+            migration.upgrade(conn)
+            conn.execute(schema_version.insert().values(
+                version=migration.version,
+                name=migration.name,
+                applied_at=datetime.utcnow()
+            ))
+            conn.commit()
+            applied.append(migration)
+
+def downgrade_all(engine):
+    """Drop every migrated object, including the version table"""
+    drop_search_index(engine)
+    db.metadata.drop_all(engine)
+    schema_version.drop(engine, checkfirst=True)
+
+db_cli = AppGroup('db', help='Manage the database schema.')
+
+@db_cli.command('upgrade')
+@click.option('--target', type=int, default=None, help='Stop at this version instead of the latest.')
+def upgrade_command(target):
+    """Apply pending migrations"""
+    applied = upgrade(db.engine, target)
+    for migration in applied:
+        click.echo(f'Applied {migration.version}: {migration.name}')
+    click.echo(f'Schema version: {current_version(db.engine)}')
+
+@db_cli.command('current')
+def current_command():
+    """Show the schema version of the database"""
+    version = current_version(db.engine)
+    status = 'up to date' if version >= latest_version() else f'{latest_version() - version} pending'
+    click.echo(f'{version} ({status})')
+
+@db_cli.command('history')
+def history_command():
+    """List all migrations and whether they have been applied"""
+    version = current_version(db.engine)
+    for migration in MIGRATIONS:
+        mark = 'x' if migration.version <= version else ' '
+        click.echo(f'[{mark}] {migration.version}: {migration.name}')
+
+@db_cli.command('reset')
+@click.confirmation_option(prompt='Drop all contacts and recreate the schema?')
+def reset_command():
+    """Drop everything and migrate from scratch"""
+    downgrade_all(db.engine)
+    upgrade(db.engine)
+    click.echo('Database reset')
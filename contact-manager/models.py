@@ -1,8 +1,45 @@
-from datetime import datetime
+import json
+import unicodedata
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import column, event, table
+from sqlalchemy.orm import Session
+from search_index import (
+    BACKEND_FTS5, BACKEND_TRIGRAM, FTS_TABLE, MIN_INDEXED_QUERY_LENGTH,
+    fts_phrase, get_search_backend
+)
 
 db = SQLAlchemy()
 
+def normalize_email(email):
+    """Canonical form of an email address used for exact lookups and dedup"""
+    email = (email or '').strip().lower()
+    return email or None
+
+def normalize_name(name):
+    """Lowercase, accent-free, single-spaced name for prefix lookups ('José  Díaz' -> 'jose diaz')"""
+    decomposed = unicodedata.normalize('NFKD', (name or '').lower())
+    name = ' '.join(''.join(ch for ch in decomposed if not unicodedata.combining(ch)).split())
+    return name or None
+
+def normalize_phone(phone):
+    """Digits-only, E.164-style phone number ('+' kept for international numbers)"""
+    phone = (phone or '').strip()
+    digits = ''.join(ch for ch in phone if ch.isdigit())
+    if not digits:
+        return None
+    if phone.startswith('+'):
+        return '+' + digits
+    if digits.startswith('00'):
+        # 00 is the international call prefix in most of the world
+        return '+' + digits[2:]
+    return digits
+
+def format_timestamp(value):
+    """Format a datetime as 'YYYY-MM-DD HH:MM:SS' (isoformat is several times faster than strftime)"""
+    return value.isoformat(sep=' ', timespec='seconds') if value is not None else None
+
 class Contact(db.Model):
     """Contact model for storing contact information"""
     
@@ -11,12 +48,17 @@ class Contact(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(100), nullable=False, index=True)
     phone_number = db.Column(db.String(20), nullable=False)
-    email = db.Column(db.String(120), nullable=False, index=True)
+    email = db.Column(db.String(120), nullable=False)
+    # Shadow columns for indexed exact lookups; kept in sync on every write path
+    email_normalized = db.Column(db.String(120), nullable=True, unique=True, index=True)
+    name_normalized = db.Column(db.String(100), nullable=True, index=True)
+    phone_normalized = db.Column(db.String(21), nullable=True, index=True)
     address = db.Column(db.Text, nullable=True)
     company = db.Column(db.String(100), nullable=True)
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Indexed: max(updated_at) is the change watermark for HTTP caching
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
     
     def __repr__(self):
         return f'<Contact {self.full_name}>'
@@ -31,18 +73,217 @@ class Contact(db.Model):
             'address': self.address,
             'company': self.company,
             'notes': self.notes,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
+            'created_at': format_timestamp(self.created_at),
+            'updated_at': format_timestamp(self.updated_at)
         }
     
+    def update_from(self, cleaned_data):
+        """Apply a form's cleaned data
+        
+        Contacts that shared an email with an older contact when migration 2
+        ran have no email_normalized (it is unique). They keep it empty while
+        the older contact still holds that email, so they stay editable until
+        the pair is merged on the duplicates page.
+        """
+        with db.session.no_autoflush:
+            unclaimed = (
+                self.email_normalized is None
+                and cleaned_data['email_normalized'] == normalize_email(self.email)
+                and Contact.find_by_email(self.email) is not None
+            )
+        for key, value in cleaned_data.items():
+            setattr(self, key, value)
+        if unclaimed:
+            self.email_normalized = None
+    
+    @staticmethod
+    def find_by_email(email):
+        """Exact, case-insensitive lookup by email (indexed point query)"""
+        normalized = normalize_email(email)
+        if normalized is None:
+            return None
+        return Contact.query.filter_by(email_normalized=normalized).first()
+    
+    @staticmethod
+    def find_by_phone(phone):
+        """Contacts whose phone number matches ignoring formatting (indexed)"""
+        normalized = normalize_phone(phone)
+        if normalized is None:
+            return []
+        return Contact.query.filter_by(phone_normalized=normalized).order_by(Contact.full_name, Contact.id).all()
+    
     @staticmethod
     def search(query):
-        """Search contacts by name, phone, or email"""
+        """Build a query for contacts matching name, phone, or email, best matches first
+        
+        Returns an unexecuted query so callers can paginate or count in the database.
+        """
+        backend = get_search_backend(db.engine)
+        indexed = len(query) >= MIN_INDEXED_QUERY_LENGTH
+        
+        if backend == BACKEND_FTS5 and indexed:
+            fts = table(FTS_TABLE, column('rowid'), column(FTS_TABLE), column('rank'))
+            return Contact.query.join(fts, fts.c.rowid == Contact.id).filter(
+                fts.c[FTS_TABLE].op('MATCH')(fts_phrase(query))
+            ).order_by(fts.c.rank, Contact.full_name, Contact.id)
+        
         search_pattern = f'%{query}%'
-        return Contact.query.filter(
-            db.or_(
-                Contact.full_name.ilike(search_pattern),
-                Contact.phone_number.like(search_pattern),
-                Contact.email.ilike(search_pattern)
+        filters = db.or_(
+            Contact.full_name.ilike(search_pattern),
+            Contact.phone_number.like(search_pattern),
+            Contact.email.ilike(search_pattern)
+        )
+        
+        if backend == BACKEND_TRIGRAM and indexed:
+            # ILIKE is served by the pg_trgm GIN indexes; rank by closest column
+            score = db.func.greatest(
+                db.func.similarity(Contact.full_name, query),
+                db.func.similarity(Contact.phone_number, query),
+                db.func.similarity(Contact.email, query)
             )
-        ).order_by(Contact.full_name).all()
+            return Contact.query.filter(filters).order_by(score.desc(), Contact.full_name, Contact.id)
+        
+        return Contact.query.filter(filters).order_by(Contact.full_name, Contact.id)
+
+
+class Job(db.Model):
+    """Background import/export job and its progress"""
+    
+    __tablename__ = 'jobs'
+    
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=QUEUED)
+    filename = db.Column(db.String(255), nullable=True)
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    stats = db.Column(db.Text, nullable=True)  # JSON-encoded stats dict
+    error = db.Column(db.Text, nullable=True)
+    result_path = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<Job {self.kind} {self.id} {self.status}>'
+    
+    @property
+    def is_done(self):
+        return self.status in (Job.FINISHED, Job.FAILED)
+    
+    @property
+    def rate(self):
+        """Rows processed per second so far"""
+        if not self.started_at:
+            return 0.0
+        elapsed = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
+        return self.rows_processed / elapsed if elapsed > 0 else 0.0
+    
+    def to_dict(self):
+        """Convert job to dictionary"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'filename': self.filename,
+            'rows_processed': self.rows_processed,
+            'rate': round(self.rate, 1),
+            'stats': json.loads(self.stats) if self.stats else None,
+            'error': self.error,
+            'created_at': format_timestamp(self.created_at),
+            'started_at': format_timestamp(self.started_at),
+            'finished_at': format_timestamp(self.finished_at)
+        }
+
+
+class DuplicateCandidate(db.Model):
+    """A pair of contacts that look like the same person, awaiting review"""
+    
+    __tablename__ = 'duplicate_candidates'
+    __table_args__ = (
+        db.UniqueConstraint('contact_id', 'duplicate_id', name='uq_duplicate_pair'),
+        db.Index('ix_duplicate_candidates_status_score', 'status', 'score'),
+    )
+    
+    PENDING = 'pending'
+    DISMISSED = 'dismissed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # contact_id < duplicate_id, so each pair is stored once
+    contact_id = db.Column(db.Integer, db.ForeignKey('contacts.id', ondelete='CASCADE'), nullable=False, index=True)
+    duplicate_id = db.Column(db.Integer, db.ForeignKey('contacts.id', ondelete='CASCADE'), nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+    reasons = db.Column(db.String(200), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default=PENDING)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    contact = db.relationship('Contact', foreign_keys=[contact_id], lazy='joined', innerjoin=True)
+    duplicate = db.relationship('Contact', foreign_keys=[duplicate_id], lazy='joined', innerjoin=True)
+    
+    def __repr__(self):
+        return f'<DuplicateCandidate {self.contact_id}~{self.duplicate_id} {self.score}>'
+    
+    def to_dict(self):
+        """Convert candidate to dictionary, with both contacts"""
+        return {
+            'id': self.id,
+            'score': self.score,
+            'reasons': self.reasons,
+            'status': self.status,
+            'contact': self.contact.to_dict(),
+            'duplicate': self.duplicate.to_dict(),
+            'created_at': format_timestamp(self.created_at)
+        }
+    
+    @staticmethod
+    def forget(session, contact_ids):
+        """Drop review entries involving contacts being deleted in this transaction
+
+        ondelete='CASCADE' only applies where the database enforces foreign
+        keys, which SQLite doesn't by default.
+        """
+        if not contact_ids:
+            return
+        session.execute(db.delete(DuplicateCandidate).where(db.or_(
+            DuplicateCandidate.contact_id.in_(contact_ids),
+            DuplicateCandidate.duplicate_id.in_(contact_ids)
+        )))
+
+
+class ContactTombstone(db.Model):
+    """Marker left by a deleted contact, so change feed clients can drop their copy"""
+    
+    __tablename__ = 'contact_tombstones'
+    # AUTOINCREMENT: ids are never reused after old tombstones are pruned
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    id = db.Column(db.Integer, primary_key=True)
+    contact_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<ContactTombstone {self.contact_id} {self.deleted_at}>'
+    
+    @staticmethod
+    def record(session, contact_ids):
+        """Add tombstones for contacts being deleted in this transaction, pruning expired ones"""
+        if not contact_ids:
+            return
+        now = datetime.utcnow()
+        session.execute(db.insert(ContactTombstone), [
+            {'contact_id': contact_id, 'deleted_at': now} for contact_id in contact_ids
+        ])
+        if has_app_context():
+            horizon = now - timedelta(days=current_app.config['CHANGES_RETENTION_DAYS'])
+            session.execute(db.delete(ContactTombstone).where(ContactTombstone.deleted_at < horizon))
+
+@event.listens_for(Session, 'before_flush')
+def _on_contacts_deleted(session, flush_context, instances):
+    """Clean up after contacts deleted through the ORM (session.delete)"""
+    contact_ids = [obj.id for obj in session.deleted if isinstance(obj, Contact)]
+    DuplicateCandidate.forget(session, contact_ids)
+    ContactTombstone.record(session, contact_ids)
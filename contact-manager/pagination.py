@@ -0,0 +1,89 @@
+import base64
+import json
+from sqlalchemy import and_, or_
+
+class KeysetPagination:
+    """A page of results addressed by opaque cursors instead of page numbers"""
+
+    is_keyset = True
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.has_next = next_cursor is not None
+        self.has_prev = prev_cursor is not None
+
+def encode_cursor(values):
+    """Encode sort-key values as an opaque URL-safe cursor"""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor (raises ValueError if malformed)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f'Invalid cursor: {str(e)}')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor: expected a list of values')
+    return values
+
+def _cursor_key(cursor):
+    """Decode a (sort value, id) cursor, rejecting anything a client could have tampered with"""
+    values = decode_cursor(cursor)
+    if len(values) != 2:
+        raise ValueError('Invalid cursor: expected two values')
+    sort_value, tie_value = values
+    # Sort columns are NOT NULL; bool is an int subclass, but never a valid key
+    if isinstance(sort_value, bool) or not isinstance(sort_value, (str, int, float)):
+        raise ValueError('Invalid cursor: bad sort value')
+    if isinstance(tie_value, bool) or not isinstance(tie_value, int):
+        raise ValueError('Invalid cursor: bad id')
+    return sort_value, tie_value
+
+def _seek_condition(sort_column, tie_column, values, forward):
+    """Rows strictly after (or before) the given key, written so a (sort, id) index range applies"""
+    sort_value, tie_value = values
+    if forward:
+        return and_(sort_column >= sort_value, or_(sort_column > sort_value, tie_column > tie_value))
+    return and_(sort_column <= sort_value, or_(sort_column < sort_value, tie_column < tie_value))
+
+def paginate_keyset(query, sort_column, tie_column, per_page, after=None, before=None, total=None):
+    """Fetch one page of `query` ordered by (sort_column, tie_column)
+
+    `after`/`before` are cursors from a previous page. Each page is a single
+    indexed range scan with LIMIT, so deep pages cost the same as the first.
+    """
+    query = query.order_by(None)
+
+    if before:
+        values = _cursor_key(before)
+        rows = query.filter(_seek_condition(sort_column, tie_column, values, forward=False)).order_by(
+            sort_column.desc(), tie_column.desc()
+        ).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if after:
+            values = _cursor_key(after)
+            query = query.filter(_seek_condition(sort_column, tie_column, values, forward=True))
+        rows = query.order_by(sort_column, tie_column).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev = after is not None
+
+    def key(item):
+        return [getattr(item, sort_column.key), getattr(item, tie_column.key)]
+
+    return KeysetPagination(
+        items,
+        per_page,
+        next_cursor=encode_cursor(key(items[-1])) if items and has_next else None,
+        prev_cursor=encode_cursor(key(items[0])) if items and has_prev else None,
+        total=total
+    )
@@ -0,0 +1,124 @@
+import logging
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+# Search backends, in order of preference
+BACKEND_FTS5 = 'fts5'        # SQLite FTS5 virtual table with trigram tokenizer
+BACKEND_TRIGRAM = 'trigram'  # PostgreSQL pg_trgm GIN indexes
+BACKEND_LIKE = 'like'        # Plain ILIKE scan (no index available)
+
+# Trigram indexes can only answer queries of at least three characters
+MIN_INDEXED_QUERY_LENGTH = 3
+
+FTS_TABLE = 'contacts_fts'
+
+# Column weights used by bm25(): name matches rank above phone/email matches
+FTS_RANK = 'bm25(10.0, 5.0, 5.0)'
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        full_name, phone_number, email,
+        content='contacts', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, full_name, phone_number, email)
+        VALUES (new.id, new.full_name, new.phone_number, new.email);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, full_name, phone_number, email)
+        VALUES ('delete', old.id, old.full_name, old.phone_number, old.email);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contacts_fts_au
+        AFTER UPDATE OF full_name, phone_number, email ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, full_name, phone_number, email)
+        VALUES ('delete', old.id, old.full_name, old.phone_number, old.email);
+        INSERT INTO {FTS_TABLE}(rowid, full_name, phone_number, email)
+        VALUES (new.id, new.full_name, new.phone_number, new.email);
+    END""",
+]
+
+_POSTGRES_DDL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS ix_contacts_full_name_trgm ON contacts USING gin (full_name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_contacts_phone_number_trgm ON contacts USING gin (phone_number gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_contacts_email_trgm ON contacts USING gin (email gin_trgm_ops)',
+]
+
+# Resolved backend per engine URL, filled by install_search_index()
+_backends = {}
+
+def install_search_index(conn):
+    """Create the search index for the connection's dialect and keep it in sync
+
+    Runs inside the caller's transaction (a migration); a failure is rolled
+    back to a savepoint and leaves plain LIKE scans in place.
+    """
+    dialect = conn.dialect.name
+    backend = BACKEND_LIKE
+    try:
+        if dialect == 'sqlite':
+            with conn.begin_nested():
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {'name': FTS_TABLE}
+                ).first()
+                for statement in _SQLITE_DDL:
+                    conn.exec_driver_sql(statement)
+                if not exists:
+                    # Index rows that were stored before the FTS table existed
+                    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+                    conn.exec_driver_sql(
+                        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', '{FTS_RANK}')"
+                    )
+            backend = BACKEND_FTS5
+        elif dialect == 'postgresql':
+            with conn.begin_nested():
+                for statement in _POSTGRES_DDL:
+                    conn.exec_driver_sql(statement)
+            backend = BACKEND_TRIGRAM
+    except DBAPIError as e:
+        # FTS5/trigram support is compiled in by default but not guaranteed
+        logger.warning(f'Search index unavailable on {dialect}, using LIKE scans: {str(e)}')
+        backend = BACKEND_LIKE
+
+    _backends[str(conn.engine.url)] = backend
+    logger.info(f'Search backend: {backend}')
+    return backend
+
+def drop_search_index(engine):
+    """Drop the search index (triggers are dropped together with the contacts table)"""
+    if engine.dialect.name == 'sqlite':
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    _backends.pop(str(engine.url), None)
+
+def detect_search_backend(engine):
+    """Find which search index already exists, without running any DDL"""
+    dialect = engine.dialect.name
+    try:
+        with engine.connect() as conn:
+            if dialect == 'sqlite':
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {'name': FTS_TABLE}
+                ).first()
+                return BACKEND_FTS5 if exists else BACKEND_LIKE
+            if dialect == 'postgresql':
+                exists = conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+                return BACKEND_TRIGRAM if exists else BACKEND_LIKE
+    except DBAPIError as e:
+        logger.warning(f'Could not detect search index on {dialect}: {str(e)}')
+    return BACKEND_LIKE
+
+def get_search_backend(engine):
+    """Return the search backend for an engine, detected on first use"""
+    key = str(engine.url)
+    if key not in _backends:
+        _backends[key] = detect_search_backend(engine)
+    return _backends[key]
+
+def fts_phrase(query):
+    """Quote a user query as a single FTS5 phrase (substring match under trigram)"""
+    return '"' + query.replace('"', '""') + '"'
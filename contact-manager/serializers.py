@@ -0,0 +1,73 @@
+import json
+from sqlalchemy import String, type_coerce
+from models import db, Contact, format_timestamp
+
+# Same keys, in the same order, as Contact.to_dict()
+CONTACT_FIELDS = [
+    'id', 'full_name', 'phone_number', 'email', 'address', 'company', 'notes',
+    'created_at', 'updated_at'
+]
+TIMESTAMP_FIELDS = ('created_at', 'updated_at')
+
+# Rows fetched from the cursor, and encoded, per streamed JSON chunk
+DEFAULT_JSON_BATCH_SIZE = 1000
+
+def _raw_timestamps():
+    """SQLite stores DateTime as ISO text; reading it raw skips datetime parsing"""
+    return db.engine.dialect.name == 'sqlite'
+
+def contact_columns():
+    """Columns for a to_dict()-shaped row, for use with select() or Query.with_entities()"""
+    raw = _raw_timestamps()
+    columns = []
+    for name in CONTACT_FIELDS:
+        column = getattr(Contact, name)
+        if raw and name in TIMESTAMP_FIELDS:
+            column = type_coerce(column, String).label(name)
+        columns.append(column)
+    return columns
+
+def _slice_timestamp(value):
+    # 'YYYY-MM-DD HH:MM:SS.ffffff' -> 'YYYY-MM-DD HH:MM:SS'
+    return value[:19] if value is not None else None
+
+def rows_to_dicts(rows):
+    """Convert rows selected with contact_columns() into to_dict()-shaped dicts
+
+    Much cheaper than hydrating ORM objects: no identity map, no attribute
+    instrumentation, and timestamps are sliced rather than strftime'd.
+    """
+    fmt = _slice_timestamp if _raw_timestamps() else format_timestamp
+    return [
+        {
+            'id': row[0],
+            'full_name': row[1],
+            'phone_number': row[2],
+            'email': row[3],
+            'address': row[4],
+            'company': row[5],
+            'notes': row[6],
+            'created_at': fmt(row[7]),
+            'updated_at': fmt(row[8])
+        }
+        for row in rows
+    ]
+
+def iter_contacts_json(statement=None, batch_size=DEFAULT_JSON_BATCH_SIZE):
+    """Yield a JSON array of contacts in chunks, streaming rows from the cursor
+
+    `statement` defaults to all contacts ordered by name; a custom one must
+    select contact_columns().
+    """
+    if statement is None:
+        statement = db.select(*contact_columns()).order_by(Contact.full_name, Contact.id)
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+
+    yield '['
+    first = True
+    for rows in result.partitions():
+        # Encode a whole batch at once and drop its surrounding brackets
+        chunk = json.dumps(rows_to_dicts(rows), ensure_ascii=False)[1:-1]
+        yield chunk if first else ',' + chunk
+        first = False
+    yield ']'
@@ -37,6 +37,166 @@ function updateFileName(input) {
     }
 }
 
+// Background job progress polling
+function renderJob(job) {
+    document.getElementById('jobState').textContent = job.status;
+    document.getElementById('jobState').className = `job-badge job-${job.status}`;
+    document.getElementById('jobRows').textContent = job.rows_processed;
+    document.getElementById('jobRate').textContent = job.rate;
+
+    if (job.stats) {
+        const stats = job.stats;
+        document.getElementById('jobSummaryRow').hidden = false;
+        // Jobs other than imports describe their own result
+        document.getElementById('jobSummary').textContent = stats.summary ||
+            `${stats.imported} imported, ${stats.updated} updated, ${stats.skipped} skipped out of ${stats.total} rows`;
+
+        const errorList = document.getElementById('jobErrors');
+        errorList.replaceChildren(...stats.errors.map(message => {
+            const item = document.createElement('li');
+            item.textContent = message;
+            return item;
+        }));
+        if (stats.error_count > stats.errors.length) {
+            const more = document.createElement('li');
+            more.textContent = `...and ${stats.error_count - stats.errors.length} more errors.`;
+            errorList.appendChild(more);
+        }
+        document.getElementById('jobErrorsRow').hidden = stats.error_count === 0;
+    }
+
+    if (job.error) {
+        document.getElementById('jobSummaryRow').hidden = false;
+        document.getElementById('jobSummary').textContent = job.error;
+    }
+
+    if (job.download_url) {
+        const link = document.getElementById('jobDownload');
+        link.href = job.download_url;
+        link.hidden = false;
+    }
+}
+
+function pollJob(container) {
+    fetch(container.dataset.statusUrl)
+        .then(response => response.json())
+        .then(job => {
+            renderJob(job);
+            if (job.status !== 'finished' && job.status !== 'failed') {
+                setTimeout(() => pollJob(container), 1000);
+            }
+        })
+        .catch(() => setTimeout(() => pollJob(container), 5000));
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.getElementById('jobStatus');
+    if (container) {
+        pollJob(container);
+    }
+});
+
+// Search-as-you-type suggestions
+const TYPEAHEAD_DELAY = 150;  // ms of quiet typing before asking the server
+
+function initTypeahead(input) {
+    const menu = document.getElementById(input.getAttribute('aria-controls'));
+    let timer = null;
+    let controller = null;
+    let active = -1;
+
+    function close() {
+        menu.hidden = true;
+        menu.replaceChildren();
+        input.setAttribute('aria-expanded', 'false');
+        active = -1;
+    }
+
+    function render(results) {
+        if (results.length === 0) {
+            close();
+            return;
+        }
+        menu.replaceChildren(...results.map(contact => {
+            const item = document.createElement('li');
+            const link = document.createElement('a');
+            const details = document.createElement('small');
+            item.setAttribute('role', 'option');
+            link.href = input.dataset.contactUrl.replace(/0$/, contact.id);
+            link.textContent = contact.name;
+            details.textContent = `${contact.email} · ${contact.phone}`;
+            link.appendChild(details);
+            item.appendChild(link);
+            return item;
+        }));
+        menu.hidden = false;
+        input.setAttribute('aria-expanded', 'true');
+        active = -1;
+    }
+
+    function highlight(index) {
+        const links = menu.querySelectorAll('a');
+        if (links.length === 0) {
+            return;
+        }
+        active = (index + links.length) % links.length;
+        links.forEach((link, i) => link.classList.toggle('active', i === active));
+    }
+
+    function suggest(query) {
+        // Only the latest keystroke's request matters; drop the one in flight
+        if (controller) {
+            controller.abort();
+        }
+        if (!query) {
+            close();
+            return;
+        }
+        controller = new AbortController();
+        const url = `${input.dataset.typeaheadUrl}?q=${encodeURIComponent(query)}`;
+        fetch(url, { signal: controller.signal })
+            .then(response => response.json())
+            .then(data => render(data.results))
+            .catch(error => {
+                if (error.name !== 'AbortError') {
+                    close();
+                }
+            });
+    }
+
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        timer = setTimeout(() => suggest(input.value.trim()), TYPEAHEAD_DELAY);
+    });
+
+    input.addEventListener('keydown', function(e) {
+        if (menu.hidden) {
+            return;
+        }
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            const step = e.key === 'ArrowDown' ? 1 : -1;
+            // Nothing highlighted yet: Down starts at the first result, Up at the last
+            highlight(active < 0 && step < 0 ? -1 : active + step);
+        } else if (e.key === 'Enter' && active >= 0) {
+            // Open the highlighted contact instead of submitting the search
+            e.preventDefault();
+            window.location = menu.querySelectorAll('a')[active].href;
+        } else if (e.key === 'Escape') {
+            close();
+        }
+    });
+
+    input.addEventListener('blur', function() {
+        // Let a click on a suggestion land before the menu goes away
+        setTimeout(close, 150);
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-typeahead-url]').forEach(initTypeahead);
+});
+
 // Auto-hide flash messages after 5 seconds
 document.addEventListener('DOMContentLoaded', function() {
     const alerts = document.querySelectorAll('.alert');
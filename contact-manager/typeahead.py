@@ -0,0 +1,103 @@
+import sys
+import threading
+from collections import OrderedDict
+from models import db, Contact, normalize_email, normalize_name
+from http_cache import contacts_watermark
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with a fixed number of entries"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+def _prefix_range(column, prefix):
+    """column LIKE 'prefix%' as a range an ordinary index can serve"""
+    # The upper bound bumps the last character below U+10FFFF, which has no successor
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return column >= prefix
+    upper = stem[:-1] + chr(ord(stem[-1]) + 1)
+    return db.and_(column >= prefix, column < upper)
+
+class Typeahead:
+    """Top matches for a name or email prefix, for search-as-you-type
+
+    Each lookup is two index range scans (name_normalized, email_normalized).
+    Results are cached per prefix; the cache key includes the contacts
+    watermark, so any insert, update or delete makes older entries
+    unreachable and they age out of the LRU.
+    """
+
+    def __init__(self, app=None):
+        self.default_limit = 8
+        self.max_limit = 20
+        self.cache = LRUCache(1024)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['typeahead'] = self
+        self.default_limit = app.config['TYPEAHEAD_LIMIT']
+        self.max_limit = app.config['TYPEAHEAD_MAX_LIMIT']
+        self.cache = LRUCache(app.config['TYPEAHEAD_CACHE_SIZE'])
+
+    def suggest(self, query, limit=None):
+        """Up to `limit` contacts whose name or email starts with `query`, names first"""
+        limit = max(1, min(limit or self.default_limit, self.max_limit))
+        name_prefix = normalize_name(query)
+        email_prefix = normalize_email(query)
+        if not name_prefix:
+            return []
+
+        key = (contacts_watermark(), name_prefix, email_prefix, limit)
+        results = self.cache.get(key)
+        if results is None:
+            results = self._lookup(name_prefix, email_prefix, limit)
+            self.cache.set(key, results)
+        return results
+
+    def _lookup(self, name_prefix, email_prefix, limit):
+        columns = (Contact.id, Contact.full_name, Contact.email, Contact.phone_number)
+        rows = db.session.execute(
+            db.select(*columns)
+            .where(_prefix_range(Contact.name_normalized, name_prefix))
+            .order_by(Contact.name_normalized, Contact.id)
+            .limit(limit)
+        ).all()
+        if len(rows) < limit:
+            seen = {row.id for row in rows}
+            rows += [
+                row for row in db.session.execute(
+                    db.select(*columns)
+                    .where(_prefix_range(Contact.email_normalized, email_prefix))
+                    .order_by(Contact.email_normalized)
+                    .limit(limit)
+                )
+                if row.id not in seen
+            ][:limit - len(rows)]
+        return [
+            {'id': row.id, 'name': row.full_name, 'email': row.email, 'phone': row.phone_number}
+            for row in rows
+        ]
+
+typeahead = Typeahead()
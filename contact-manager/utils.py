@@ -1,37 +1,239 @@
+import codecs
 import csv
 import io
 import logging
 from datetime import datetime
-from models import Contact, db
+from itertools import repeat
+from sqlalchemy.dialects import postgresql, sqlite
+from models import Contact, db, normalize_email, normalize_name, normalize_phone
+from cache import stats_cache
 
 logger = logging.getLogger(__name__)
 
-def export_contacts_to_csv(contacts):
-    """Export contacts to CSV format"""
+EXPORT_FIELDNAMES = ['full_name', 'phone_number', 'email', 'address', 'company', 'notes']
+
+# Contacts fetched from the cursor, and serialized, per yielded CSV chunk
+DEFAULT_EXPORT_BATCH_SIZE = 1000
+
+def iter_contacts_csv(batch_size=DEFAULT_EXPORT_BATCH_SIZE, progress=None):
+    """Yield all contacts as CSV text, one chunk per `batch_size` rows
+    
+    Rows are streamed from the database cursor as plain column tuples, so
+    memory use is bounded by the batch size rather than the table size.
+    The first chunk (the header) is yielded only after the query has run.
+    `progress`, if given, is called with the running row count per chunk.
+    """
+    columns = [getattr(Contact, name) for name in EXPORT_FIELDNAMES]
+    statement = db.select(*columns).order_by(Contact.full_name, Contact.id)
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    
+    output = io.StringIO()
+    writer = csv.writer(output)  # writes None as an empty field
+    writer.writerow(EXPORT_FIELDNAMES)
+    yield output.getvalue()
+    
+    exported = 0
+    for rows in result.partitions():
+        output.seek(0)
+        output.truncate()
+        writer.writerows(rows)
+        exported += len(rows)
+        yield output.getvalue()
+        if progress:
+            progress(exported)
+    
+    logger.info(f'Exported {exported} contacts to CSV')
+
+# Rows per batch: one upsert (or, on other dialects, one IN (...) lookup plus
+# bulk insert/update) and one commit each. Kept under SQLite's historical
+# limit of 999 bound parameters.
+DEFAULT_CHUNK_SIZE = 500
+
+# Bytes inspected to choose an encoding when the upload has no byte-order mark
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# Legacy Excel exports are usually Windows-1252; undecodable bytes become U+FFFD
+FALLBACK_ENCODING = 'cp1252'
+
+def _decode_as_fallback(error):
+    """Decode bytes that aren't valid UTF-8 as FALLBACK_ENCODING instead of failing"""
+    invalid = error.object[error.start:error.end]
+    return invalid.decode(FALLBACK_ENCODING, errors='replace'), error.end
+
+# Only the start of an upload is sampled, so a file that looked like UTF-8
+# may still hold legacy bytes further down; those are decoded one by one
+# rather than stopping the import part-way
+UTF8_ERRORS = 'contact-manager-fallback'
+codecs.register_error(UTF8_ERRORS, _decode_as_fallback)
+
+# UTF-32 LE must be checked before UTF-16 LE, whose BOM is its prefix
+_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+]
+
+def detect_encoding(sample):
+    """Pick an encoding for a CSV upload from its first bytes"""
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
     try:
-        output = io.StringIO()
-        fieldnames = ['full_name', 'phone_number', 'email', 'address', 'company', 'notes']
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        
-        writer.writeheader()
-        for contact in contacts:
-            writer.writerow({
-                'full_name': contact.full_name,
-                'phone_number': contact.phone_number,
-                'email': contact.email,
-                'address': contact.address or '',
-                'company': contact.company or '',
-                'notes': contact.notes or ''
-            })
+        # Incremental so a multi-byte character cut at the sample edge is not an error
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+
+def open_csv_text(file_stream):
+    """Wrap a binary upload in a text stream that decodes as it is read
+    
+    Only ENCODING_SAMPLE_SIZE bytes are buffered up front, so memory use does
+    not grow with the size of the upload. Call detach() on the result when
+    done to leave the underlying upload open.
+    """
+    raw = getattr(file_stream, 'stream', file_stream)  # unwrap werkzeug FileStorage
+    buffered = raw if hasattr(raw, 'peek') else io.BufferedReader(raw, ENCODING_SAMPLE_SIZE)
+    encoding = detect_encoding(buffered.peek(ENCODING_SAMPLE_SIZE)[:ENCODING_SAMPLE_SIZE])
+    return io.TextIOWrapper(
+        buffered,
+        encoding=encoding,
+        errors=UTF8_ERRORS if encoding.startswith('utf-8') else 'replace',
+        newline=''
+    )
+
+def _chunked(iterable, size):
+    """Yield lists of up to `size` items from an iterable"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _clean_csv_row(row):
+    """Return column values for a CSV row, keyed like Contact attributes"""
+    return {
+        'full_name': row['full_name'].strip(),
+        'phone_number': row['phone_number'].strip(),
+        'email': row['email'].strip().lower(),
+        'email_normalized': normalize_email(row['email']),
+        'name_normalized': normalize_name(row['full_name']),
+        'phone_normalized': normalize_phone(row['phone_number']),
+        'address': (row.get('address') or '').strip() or None,
+        'company': (row.get('company') or '').strip() or None,
+        'notes': (row.get('notes') or '').strip() or None
+    }
+
+# Dialects with INSERT ... ON CONFLICT; others fall back to SELECT-then-write
+UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+def _upsert(insert, rows, now):
+    """INSERT ... ON CONFLICT (email_normalized) DO UPDATE; returns how many rows were new
+
+    Each row is inserted or updated atomically, so a contact with the same
+    email written concurrently (another import, the API) becomes an update
+    instead of an IntegrityError. New rows are told apart by created_at,
+    which the update leaves alone.
+    """
+    table = Contact.__table__
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.email_normalized],
+        set_={name: statement.excluded[name] for name in rows[0] if name != 'created_at'}
+    ).returning(table.c.created_at)
+    created = db.session.execute(statement, rows).scalars()
+    return sum(1 for created_at in created if created_at == now)
+
+def _import_chunk(rows, stats, validator=None):
+    """Upsert one chunk of (row_num, row) pairs; returns (imported, updated)"""
+    pending = {}  # normalized email -> values, first occurrence order
+    repeated = 0
+    
+    if validator is not None:
+        row_errors = validator.validate([row for _, row in rows])
+    else:
+        row_errors = repeat(None)
+    
+    for (row_num, row), errors in zip(rows, row_errors):
+        stats['total'] += 1
+        try:
+            if errors:
+                # Same rules and messages as the contact form
+                stats['skipped'] += 1
+                stats['errors'].append(f"Row {row_num}: {' '.join(errors.values())}")
+                continue
+            # Validate required fields
+            if not row.get('full_name') or not row.get('phone_number') or not row.get('email'):
+                stats['skipped'] += 1
+                stats['errors'].append(f"Row {row_num}: Missing required fields")
+                continue
+            
+            values = _clean_csv_row(row)
+        except Exception as e:
+            stats['skipped'] += 1
+            stats['errors'].append(f"Row {row_num}: {str(e)}")
+            logger.error(f'Error importing row {row_num}: {str(e)}')
+            continue
         
-        logger.info(f'Exported {len(contacts)} contacts to CSV')
-        return output.getvalue()
-    except Exception as e:
-        logger.error(f'Error exporting contacts to CSV: {str(e)}')
-        raise
+        key = values['email_normalized']
+        if key in pending:
+            # A later row for the same email updates the earlier one
+            pending[key].update(values)
+            repeated += 1
+        else:
+            pending[key] = values
+    
+    if not pending:
+        return 0, repeated
+    
+    now = datetime.utcnow()
+    insert = UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        rows = [dict(values, created_at=now, updated_at=now) for values in pending.values()]
+        imported = _upsert(insert, rows, now)
+        return imported, len(rows) - imported + repeated
+    
+    # Check for duplicates by email with one indexed query for the whole chunk
+    existing = dict(db.session.execute(
+        db.select(Contact.email_normalized, Contact.id).where(Contact.email_normalized.in_(list(pending)))
+    ).all())
+    
+    inserts = []
+    updates = []
+    for email, values in pending.items():
+        if email in existing:
+            updates.append(dict(values, contact_id=existing[email], updated_at=now))
+        else:
+            inserts.append(dict(values, created_at=now, updated_at=now))
+    
+    # Core executemany: one statement per chunk (the ORM bulk path splits
+    # batches whenever the set of NULL columns changes between rows)
+    table = Contact.__table__
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+    if updates:
+        db.session.execute(
+            table.update().where(table.c.id == db.bindparam('contact_id')),
+            updates
+        )
+    
+    return len(inserts), len(updates) + repeated
 
-def import_contacts_from_csv(file_stream):
-    """Import contacts from CSV file"""
+def import_contacts_from_csv(file_stream, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, validator=None):
+    """Import contacts from CSV file
+    
+    The upload is read as a stream. Rows are processed in chunks of
+    `chunk_size`, each committed on its own, so a failure part-way through
+    keeps the chunks already written. `progress`, if given, is called with
+    the rows read so far and the running stats after each chunk. With a
+    `validator` (forms.BulkValidator) every row must pass the contact form
+    rules; otherwise only the required columns are checked.
+    """
     stats = {
         'total': 0,
         'imported': 0,
@@ -40,59 +242,30 @@ def import_contacts_from_csv(file_stream):
         'errors': []
     }
     
+    stream = None
     try:
-        # Read CSV file
-        stream = io.StringIO(file_stream.read().decode('utf-8'))
+        # Decode and parse the upload incrementally; only one chunk of rows is held at a time
+        stream = open_csv_text(file_stream)
         reader = csv.DictReader(stream)
         
-        for row_num, row in enumerate(reader, start=2):
-            stats['total'] += 1
-            
-            try:
-                # Validate required fields
-                if not row.get('full_name') or not row.get('phone_number') or not row.get('email'):
-                    stats['skipped'] += 1
-                    stats['errors'].append(f"Row {row_num}: Missing required fields")
-                    continue
-                
-                # Check for duplicate by email
-                existing = Contact.query.filter_by(email=row['email'].strip().lower()).first()
-                
-                if existing:
-                    # Update existing contact
-                    existing.full_name = row['full_name'].strip()
-                    existing.phone_number = row['phone_number'].strip()
-                    existing.address = row.get('address', '').strip() or None
-                    existing.company = row.get('company', '').strip() or None
-                    existing.notes = row.get('notes', '').strip() or None
-                    existing.updated_at = datetime.utcnow()
-                    stats['updated'] += 1
-                else:
-                    # Create new contact
-                    contact = Contact(
-                        full_name=row['full_name'].strip(),
-                        phone_number=row['phone_number'].strip(),
-                        email=row['email'].strip().lower(),
-                        address=row.get('address', '').strip() or None,
-                        company=row.get('company', '').strip() or None,
-                        notes=row.get('notes', '').strip() or None
-                    )
-                    db.session.add(contact)
-                    stats['imported'] += 1
-            
-            except Exception as e:
-                stats['skipped'] += 1
-                stats['errors'].append(f"Row {row_num}: {str(e)}")
-                logger.error(f"Error importing row {row_num}: {str(e)}")
+        for chunk in _chunked(enumerate(reader, start=2), chunk_size):
+            imported, updated = _import_chunk(chunk, stats, validator)
+            db.session.commit()
+            stats_cache.contacts_added(imported)
+            stats['imported'] += imported
+            stats['updated'] += updated
+            if progress:
+                progress(stats['total'], stats)
         
-        # Commit all changes
-        db.session.commit()
         logger.info(f"CSV import completed: {stats['imported']} imported, {stats['updated']} updated, {stats['skipped']} skipped")
         
     except Exception as e:
         db.session.rollback()
         logger.error(f'Error importing CSV: {str(e)}')
         stats['errors'].append(f"File error: {str(e)}")
+    finally:
+        if stream is not None:
+            stream.detach()
     
     return stats
 
@@ -0,0 +1,385 @@
+import os
+from datetime import datetime
+from flask import Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, stream_with_context, jsonify, send_file, abort
+from sqlalchemy.exc import IntegrityError
+from models import db, Contact, DuplicateCandidate, Job
+from forms import ContactForm, BulkValidator
+from pagination import paginate_keyset
+from cache import stats_cache
+from http_cache import conditional, contacts_watermark, contact_watermark
+from jobs import job_manager, run_import_job, run_export_job, run_dedup_job
+
+# HTML pages. The CSV helpers in utils are imported inside the import/export
+# views so that cold starts serving other pages never load them.
+main = Blueprint('main', __name__)
+
+# Routes
+
+@main.route('/')
+@conditional(contacts_watermark)
+def index():
+    """Home page"""
+    try:
+        return render_template(
+            'index.html',
+            total_contacts=stats_cache.total_contacts(),
+            top_companies=stats_cache.top_companies()
+        )
+    except Exception as e:
+        current_app.logger.error(f'Error loading home page: {str(e)}')
+        flash('An error occurred while loading the page.', 'error')
+        return render_template('index.html', total_contacts=0)
+
+@main.route('/contacts')
+@conditional(contacts_watermark)
+def contacts_list():
+    """List all contacts with search and pagination"""
+    try:
+        # Get search query
+        search_query = request.args.get('search', '').strip()
+        page = request.args.get('page', 1, type=int)
+        
+        # Base query
+        if search_query:
+            query = Contact.search(search_query)
+        else:
+            query = Contact.query.order_by(Contact.full_name, Contact.id)
+        
+        if not search_query and current_app.config['CONTACTS_PAGINATION'] == 'keyset' and 'page' not in request.args:
+            # Cursor pagination: one indexed range scan per page, no OFFSET
+            total = stats_cache.total_contacts()
+            try:
+                pagination = paginate_keyset(
+                    query,
+                    Contact.full_name,
+                    Contact.id,
+                    per_page=current_app.config['CONTACTS_PER_PAGE'],
+                    after=request.args.get('after'),
+                    before=request.args.get('before'),
+                    total=total
+                )
+            except ValueError as e:
+                current_app.logger.warning(f'Ignoring pagination cursor: {str(e)}')
+                pagination = paginate_keyset(query, Contact.full_name, Contact.id,
+                                             per_page=current_app.config['CONTACTS_PER_PAGE'], total=total)
+        else:
+            # LIMIT/OFFSET plus COUNT in the database, so only one page is loaded
+            pagination = query.paginate(
+                page=page,
+                per_page=current_app.config['CONTACTS_PER_PAGE'],
+                error_out=False
+            )
+        
+        return render_template(
+            'contacts_list.html',
+            contacts=pagination.items,
+            pagination=pagination,
+            search_query=search_query
+        )
+    except Exception as e:
+        current_app.logger.error(f'Error loading contacts list: {str(e)}')
+        flash('An error occurred while loading contacts.', 'error')
+        return render_template('contacts_list.html', contacts=[], pagination=None)
+
+@main.route('/contacts/add', methods=['GET', 'POST'])
+def add_contact():
+    """Add new contact"""
+    if request.method == 'POST':
+        try:
+            # Validate form
+            form = ContactForm(request.form)
+            
+            if not form.validate():
+                for field, error in form.errors.items():
+                    flash(f'{field.replace("_", " ").title()}: {error}', 'error')
+                return render_template('contact_form.html', contact=None, form_data=request.form)
+            
+            # Create new contact
+            cleaned_data = form.get_cleaned_data()
+            contact = Contact(**cleaned_data)
+            
+            db.session.add(contact)
+            db.session.commit()
+            stats_cache.contacts_added()
+            
+            current_app.logger.info(f'Contact created: {contact.full_name} (ID: {contact.id})')
+            flash(f'Contact "{contact.full_name}" added successfully!', 'success')
+            return redirect(url_for('main.contacts_list'))
+        
+        except IntegrityError:
+            # email_normalized is unique
+            db.session.rollback()
+            flash('Email: A contact with this email already exists.', 'error')
+            return render_template('contact_form.html', contact=None, form_data=request.form)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Error creating contact: {str(e)}')
+            flash('An error occurred while adding the contact. Please try again.', 'error')
+            return render_template('contact_form.html', contact=None, form_data=request.form)
+    
+    return render_template('contact_form.html', contact=None, form_data=None)
+
+@main.route('/contacts/<int:contact_id>')
+@conditional(contact_watermark, last_modified=True)
+def view_contact(contact_id):
+    """View contact details"""
+    try:
+        contact = Contact.query.get_or_404(contact_id)
+        return render_template('contact_detail.html', contact=contact)
+    except Exception as e:
+        current_app.logger.error(f'Error viewing contact {contact_id}: {str(e)}')
+        flash('Contact not found.', 'error')
+        return redirect(url_for('main.contacts_list'))
+
+@main.route('/contacts/<int:contact_id>/edit', methods=['GET', 'POST'])
+def edit_contact(contact_id):
+    """Edit existing contact"""
+    try:
+        contact = Contact.query.get_or_404(contact_id)
+        
+        if request.method == 'POST':
+            # Validate form
+            form = ContactForm(request.form)
+            
+            if not form.validate():
+                for field, error in form.errors.items():
+                    flash(f'{field.replace("_", " ").title()}: {error}', 'error')
+                return render_template('contact_form.html', contact=contact, form_data=request.form)
+            
+            # Update contact
+            contact.update_from(form.get_cleaned_data())
+            
+            contact.updated_at = datetime.utcnow()
+            db.session.commit()
+            stats_cache.contacts_updated()
+            
+            current_app.logger.info(f'Contact updated: {contact.full_name} (ID: {contact.id})')
+            flash(f'Contact "{contact.full_name}" updated successfully!', 'success')
+            return redirect(url_for('main.view_contact', contact_id=contact.id))
+        
+        return render_template('contact_form.html', contact=contact, form_data=None)
+    
+    except IntegrityError:
+        # email_normalized is unique
+        db.session.rollback()
+        flash('Email: A contact with this email already exists.', 'error')
+        return render_template('contact_form.html', contact=db.session.get(Contact, contact_id), form_data=request.form)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error editing contact {contact_id}: {str(e)}')
+        flash('An error occurred. Please try again.', 'error')
+        return redirect(url_for('main.contacts_list'))
+
+@main.route('/contacts/<int:contact_id>/delete', methods=['POST'])
+def delete_contact(contact_id):
+    """Delete contact"""
+    try:
+        contact = Contact.query.get_or_404(contact_id)
+        contact_name = contact.full_name
+        
+        db.session.delete(contact)
+        db.session.commit()
+        stats_cache.contacts_deleted()
+        
+        current_app.logger.info(f'Contact deleted: {contact_name} (ID: {contact_id})')
+        flash(f'Contact "{contact_name}" deleted successfully!', 'success')
+    
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error deleting contact {contact_id}: {str(e)}')
+        flash('An error occurred while deleting the contact.', 'error')
+    
+    return redirect(url_for('main.contacts_list'))
+
+@main.route('/import-export', methods=['GET', 'POST'])
+def import_export():
+    """Import/Export contacts page"""
+    if request.method == 'POST':
+        # Handle CSV import
+        if 'csv_file' not in request.files:
+            flash('No file selected.', 'error')
+            return redirect(url_for('main.import_export'))
+        
+        file = request.files['csv_file']
+        
+        if file.filename == '':
+            flash('No file selected.', 'error')
+            return redirect(url_for('main.import_export'))
+        
+        from utils import import_contacts_from_csv, allowed_file
+        if file and allowed_file(file.filename):
+            validator = BulkValidator.for_import(current_app.config)
+            if request.form.get('background') or (request.content_length or 0) > current_app.config['ASYNC_IMPORT_THRESHOLD']:
+                try:
+                    job = job_manager.create('import', filename=file.filename)
+                    upload_path = job_manager.path_for(job.id, '.upload.csv')
+                    file.save(upload_path)
+                    job_manager.submit(job, run_import_job, upload_path, current_app.config['IMPORT_CHUNK_SIZE'], validator)
+                    current_app.logger.info(f'CSV import queued as job {job.id}')
+                    return redirect(url_for('main.view_job', job_id=job.id))
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.error(f'Error queueing CSV import: {str(e)}')
+                    flash('An error occurred while starting the import.', 'error')
+                    return redirect(url_for('main.import_export'))
+            
+            try:
+                stats = import_contacts_from_csv(
+                    file,
+                    chunk_size=current_app.config['IMPORT_CHUNK_SIZE'],
+                    validator=validator
+                )
+                
+                # Display results
+                flash(f'Import completed: {stats["imported"]} imported, {stats["updated"]} updated, {stats["skipped"]} skipped out of {stats["total"]} total rows.', 'success')
+                
+                if stats['errors']:
+                    for error in stats['errors'][:5]:  # Show first 5 errors
+                        flash(error, 'warning')
+                    if len(stats['errors']) > 5:
+                        flash(f'...and {len(stats["errors"]) - 5} more errors.', 'warning')
+                
+                current_app.logger.info(f'CSV import: {stats["imported"]} imported, {stats["updated"]} updated')
+            
+            except Exception as e:
+                current_app.logger.error(f'Error importing CSV: {str(e)}')
+                flash('An error occurred during import. Please check your CSV file format.', 'error')
+        else:
+            flash('Invalid file type. Only CSV files are allowed.', 'error')
+        
+        return redirect(url_for('main.import_export'))
+    
+    return render_template('import_export.html')
+
+@main.route('/export')
+@conditional(contacts_watermark)
+def export_contacts():
+    """Export all contacts to CSV"""
+    from utils import iter_contacts_csv
+    try:
+        chunks = iter_contacts_csv(batch_size=current_app.config['EXPORT_BATCH_SIZE'])
+        # Run the query now so database errors still redirect with a message
+        header = next(chunks)
+        
+        filename = f'contacts_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        
+        def generate():
+            yield header
+            yield from chunks
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    
+    except Exception as e:
+        current_app.logger.error(f'Error exporting contacts: {str(e)}')
+        flash('An error occurred while exporting contacts.', 'error')
+        return redirect(url_for('main.import_export'))
+
+@main.route('/export/background', methods=['POST'])
+def export_contacts_background():
+    """Start a background export that can be downloaded when finished"""
+    try:
+        job = job_manager.create('export')
+        job_manager.submit(job, run_export_job, job_manager.path_for(job.id, '.csv'), current_app.config['EXPORT_BATCH_SIZE'])
+        current_app.logger.info(f'CSV export queued as job {job.id}')
+        return redirect(url_for('main.view_job', job_id=job.id))
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error queueing CSV export: {str(e)}')
+        flash('An error occurred while starting the export.', 'error')
+        return redirect(url_for('main.import_export'))
+
+@main.route('/jobs/<job_id>')
+def view_job(job_id):
+    """Job progress page"""
+    job = db.get_or_404(Job, job_id)
+    return render_template('job_status.html', job=job)
+
+@main.route('/jobs/<job_id>/status')
+def job_status(job_id):
+    """Job progress as JSON, polled by the job page"""
+    job = db.get_or_404(Job, job_id)
+    data = job.to_dict()
+    data['download_url'] = url_for('main.download_job', job_id=job.id) if job.status == Job.FINISHED and job.result_path else None
+    return jsonify(data)
+
+@main.route('/jobs/<job_id>/download')
+def download_job(job_id):
+    """Download the file produced by a finished export job"""
+    job = db.get_or_404(Job, job_id)
+    if job.status != Job.FINISHED or not job.result_path or not os.path.exists(job.result_path):
+        abort(404)
+    filename = f'contacts_export_{job.finished_at.strftime("%Y%m%d_%H%M%S")}.csv'
+    return send_file(job.result_path, mimetype='text/csv', as_attachment=True, download_name=filename)
+
+@main.route('/duplicates')
+def duplicates():
+    """Review queue of likely duplicate contacts, best matches first"""
+    page = request.args.get('page', 1, type=int)
+    pagination = DuplicateCandidate.query.filter_by(status=DuplicateCandidate.PENDING).order_by(
+        DuplicateCandidate.score.desc(), DuplicateCandidate.id
+    ).paginate(page=page, per_page=current_app.config['CONTACTS_PER_PAGE'], error_out=False)
+    return render_template('duplicates.html', candidates=pagination.items, pagination=pagination)
+
+@main.route('/duplicates/scan', methods=['POST'])
+def start_duplicate_scan():
+    """Start a background scan for duplicate contacts"""
+    try:
+        job = job_manager.create('dedup')
+        job_manager.submit(job, run_dedup_job, current_app.config['DEDUP_THRESHOLD'])
+        current_app.logger.info(f'Duplicate scan queued as job {job.id}')
+        return redirect(url_for('main.view_job', job_id=job.id))
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error queueing duplicate scan: {str(e)}')
+        flash('An error occurred while starting the duplicate scan.', 'error')
+        return redirect(url_for('main.duplicates'))
+
+@main.route('/duplicates/<int:candidate_id>/<action>', methods=['POST'])
+def resolve_duplicate(candidate_id, action):
+    """Merge a pair into the chosen contact, or dismiss it"""
+    from dedup import resolve_candidate
+    if action not in ('merge', 'dismiss'):
+        abort(404)
+    candidate = db.get_or_404(DuplicateCandidate, candidate_id)
+    try:
+        keep = resolve_candidate(candidate, request.form.get('keep', type=int), merge=action == 'merge')
+        db.session.commit()
+        if keep is None:
+            flash('Marked as not a duplicate.', 'success')
+        else:
+            stats_cache.contacts_deleted()
+            current_app.logger.info(f'Duplicate pair {candidate_id} merged into contact {keep.id}')
+            flash(f'Contacts merged into "{keep.full_name}".', 'success')
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'error')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error resolving duplicate pair {candidate_id}: {str(e)}')
+        flash('An error occurred. Please try again.', 'error')
+    return redirect(url_for('main.duplicates'))
+
+# Error handlers
+
+def _is_api_request():
+    """JSON API clients get JSON errors, including for URLs no API route matched"""
+    return request.blueprint == 'api' or request.path.startswith('/api/')
+
+@main.app_errorhandler(404)
+def not_found_error(error):
+    if _is_api_request():
+        return jsonify(error='Not found.'), 404
+    return render_template('index.html'), 404
+
+@main.app_errorhandler(500)
+def internal_error(error):
+    db.session.rollback()
+    current_app.logger.error(f'Server error: {str(error)}')
+    if _is_api_request():
+        return jsonify(error='An internal error occurred.'), 500
+    flash('An internal error occurred. Please try again later.', 'error')
+    return render_template('index.html'), 500